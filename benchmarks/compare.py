@@ -0,0 +1,49 @@
+"""
+Compares two benchmark reports stage by stage:
+
+    python -m benchmarks.compare benchmarks/results/base.json benchmarks/results/new.json
+
+Ratios below 1.0 mean the new run is faster; changes in correctness are flagged.
+"""
+import argparse
+import json
+
+
+def compare_reports(base, new, metric="mean_ms"):
+    rows = []
+    for stage, base_stats in base["stages"].items():
+        new_stats = new["stages"].get(stage, {"calls": 0})
+        if not base_stats.get("calls") or not new_stats.get("calls"):
+            continue
+        ratio = new_stats[metric] / base_stats[metric] if base_stats[metric] else None
+        rows.append({
+            "stage": stage,
+            "base": base_stats[metric],
+            "new": new_stats[metric],
+            "ratio": round(ratio, 3) if ratio is not None else None,
+            "base_correct": base_stats.get("correct"),
+            "new_correct": new_stats.get("correct"),
+        })
+    return rows
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compare two benchmark reports")
+    parser.add_argument("base")
+    parser.add_argument("new")
+    parser.add_argument("--metric", default="mean_ms", choices=["mean_ms", "p50_ms", "p95_ms", "ms_per_page"])
+    args = parser.parse_args()
+    with open(args.base) as f:
+        base = json.load(f)
+    with open(args.new) as f:
+        new = json.load(f)
+
+    print(f"base: {base['meta']['git_commit']} {base['meta']['pipeline_version']} ({base['meta']['timestamp']})")
+    print(f"new:  {new['meta']['git_commit']} {new['meta']['pipeline_version']} ({new['meta']['timestamp']})\n")
+    print(f"{'stage':<28}{'base':>10}{'new':>10}{'ratio':>8}")
+    for row in compare_reports(base, new, args.metric):
+        flag = "" if row["base_correct"] == row["new_correct"] else \
+            f"  ⚠️ correct {row['base_correct']} -> {row['new_correct']}"
+        ratio = f"{row['ratio']:.2f}x" if row["ratio"] is not None else "-"
+        print(f"{row['stage']:<28}{row['base']:>10.1f}{row['new']:>10.1f}{ratio:>8}{flag}")
+    print(f"\npeak RSS: {base['peak_rss_mb']} MB -> {new['peak_rss_mb']} MB")
@@ -0,0 +1,272 @@
+"""
+Per-stage benchmark over the synthetic corpus. Every stage is timed per document
+with fresh state (a new ParsedDocument, so text-layer and OCR work is counted),
+checked against the corpus manifest, and reported with its peak resident memory
+(the kernel's high-water mark, reset before every call on Linux).
+
+    python -m benchmarks.synthetic --out benchmarks/corpus
+    python -m benchmarks.run --corpus benchmarks/corpus --output benchmarks/results/base.json
+    python -m benchmarks.compare benchmarks/results/base.json benchmarks/results/new.json
+
+--skip-ocr limits the run to the digital documents (no OCR model needed);
+--tracemalloc adds the Python-heap peak per stage at some cost in speed.
+"""
+import argparse
+import copy
+import json
+import os
+import platform
+import resource
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+
+sys.path.append(os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src"))
+
+from src.utils.document import ParsedDocument
+from src.utils.extractor import extract_using_columns, extract_using_ocr_layout
+from src.utils.non_dms_extractor import decode_and_extract_non_dms
+from src.utils.ocr_engine import ocr_stats, warm_up
+from src.utils.router import categorize_document
+from src.utils.soa_index import SoaIndex
+from src.utils.soa_source import FilesystemSoaSource, set_soa_source
+from src.utils.text_backends import TEXT_BACKEND
+from src.utils.validator import validate_non_dms_request, validate_waiver_request
+from src.utils.versions import pipeline_version
+
+STAGES = ("categorize_document", "extract_using_columns", "extract_using_ocr_layout",
+          "decode_and_extract_non_dms", "validate_waiver_request", "validate_non_dms_request")
+
+
+# Peak resident memory seen before the last high-water-mark reset
+_peak_before_reset_mb = 0.0
+
+
+def _status_mb(field):
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith(field + ":"):
+                    return round(int(line.split()[1]) / 1024, 1)
+    except OSError:
+        pass
+    return None
+
+
+def _hwm_rss_mb():
+    return _status_mb("VmHWM")
+
+
+def _reset_peak_rss():
+    """
+    Resets the kernel's resident-set high-water mark (VmHWM) so the next reading is the
+    peak of the code that runs in between. Linux only; False where it is not supported.
+    """
+    global _peak_before_reset_mb
+    current = _hwm_rss_mb()
+    if current is None:
+        return False
+    try:
+        with open("/proc/self/clear_refs", "w") as f:
+            f.write("5")
+    except OSError:
+        return False
+    # The reset clears ru_maxrss as well, so the run-wide peak is carried over here
+    _peak_before_reset_mb = max(_peak_before_reset_mb, current)
+    return True
+
+
+def _run_peak_rss_mb():
+    current = _hwm_rss_mb() or round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1)
+    return max(_peak_before_reset_mb, current)
+
+
+def _git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+class StageTimer:
+    """Collects per-call timings, correctness and memory for one stage."""
+
+    def __init__(self, name, use_tracemalloc):
+        self.name = name
+        self.use_tracemalloc = use_tracemalloc
+        self.samples = []  # {"file_name", "seconds", "pages", "correct"}
+        self.tracemalloc_peak_kb = 0
+        self.peak_rss_mb = None  # highest VmHWM over this stage's calls, each measured from a reset
+        self.rss_growth_mb = None  # largest rise of that peak above the RSS a call started with
+
+    def measure(self, file_name, pages, func, check=None, repeat=1):
+        """Best of `repeat` calls of func(); check(result) -> bool marks the output correct."""
+        best, result = None, None
+        for _ in range(repeat):
+            if self.use_tracemalloc:
+                tracemalloc.start()
+            hwm_reset = _reset_peak_rss()
+            rss_start = _status_mb("VmRSS")
+            start = time.perf_counter()
+            result = func()
+            elapsed = time.perf_counter() - start
+            if hwm_reset:
+                peak = _hwm_rss_mb()
+                self.peak_rss_mb = max(self.peak_rss_mb or 0.0, peak)
+                self.rss_growth_mb = round(max(self.rss_growth_mb or 0.0, peak - rss_start), 1)
+            if self.use_tracemalloc:
+                self.tracemalloc_peak_kb = max(self.tracemalloc_peak_kb, tracemalloc.get_traced_memory()[1] // 1024)
+                tracemalloc.stop()
+            best = elapsed if best is None else min(best, elapsed)
+        self.samples.append({"file_name": file_name, "seconds": round(best, 6), "pages": pages,
+                             "correct": None if check is None else bool(check(result))})
+        return result
+
+    def summary(self):
+        if not self.samples:
+            return {"calls": 0}
+        ms = sorted(1000 * s["seconds"] for s in self.samples)
+        total_pages = sum(s["pages"] for s in self.samples)
+        checked = [s["correct"] for s in self.samples if s["correct"] is not None]
+        summary = {
+            "calls": len(ms),
+            "pages": total_pages,
+            "total_s": round(sum(ms) / 1000, 4),
+            "mean_ms": round(statistics.fmean(ms), 3),
+            "p50_ms": round(ms[len(ms) // 2], 3),
+            "p95_ms": round(ms[min(len(ms) - 1, int(len(ms) * 0.95))], 3),
+            "max_ms": round(ms[-1], 3),
+            "ms_per_page": round(sum(ms) / total_pages, 3) if total_pages else None,
+            "correct": f"{sum(checked)}/{len(checked)}" if checked else None,
+            "peak_rss_mb": self.peak_rss_mb,
+            "rss_growth_mb": self.rss_growth_mb,
+        }
+        if self.use_tracemalloc:
+            summary["tracemalloc_peak_kb"] = self.tracemalloc_peak_kb
+        return summary
+
+
+def _keys_match(expected):
+    return lambda found: sorted(found) == sorted(expected)
+
+
+def run_benchmark(corpus, skip_ocr=False, repeat=1, use_tracemalloc=False, warm_ocr=True):
+    with open(os.path.join(corpus, "manifest.json")) as f:
+        manifest = json.load(f)
+    documents = [d for d in manifest["documents"] if not (skip_ocr and d["layout"] == "raster")]
+    raw_dir = os.path.join(corpus, "raw_files")
+    timers = {name: StageTimer(name, use_tracemalloc) for name in STAGES}
+    setup = {}
+
+    # Validators read the corpus' own SOA files through a throwaway index
+    index_dir = tempfile.mkdtemp(prefix="bench_soa_")
+    start = time.perf_counter()
+    index = SoaIndex(soa_dir=os.path.join(corpus, "soa_database"), index_path=os.path.join(index_dir, "soa.sqlite"))
+    index.refresh(force=True)
+    setup["soa_index_build_s"] = round(time.perf_counter() - start, 4)
+    set_soa_source(FilesystemSoaSource(index))
+
+    if warm_ocr and any(d["layout"] == "raster" for d in documents):
+        # Model load is reported once instead of inflating the first OCR'd document
+        start = time.perf_counter()
+        warm_up()
+        setup["ocr_warm_up_s"] = round(time.perf_counter() - start, 4)
+
+    for doc in documents:
+        file_name, pages = doc["file_name"], doc["pages"]
+        with open(os.path.join(raw_dir, file_name), "rb") as f:
+            pdf_bytes = f.read()
+        print(f">>> {file_name} ({doc['layout']}, {pages} page(s))")
+
+        timers["categorize_document"].measure(
+            file_name, pages, lambda: categorize_document(ParsedDocument(pdf_bytes, file_name=file_name)),
+            check=lambda category: category == doc["category"], repeat=repeat)
+
+        if doc["kind"] == "dms":
+            if doc["layout"] == "digital":
+                full_text = ParsedDocument(pdf_bytes).full_text
+                rows = timers["extract_using_columns"].measure(
+                    file_name, pages, lambda: extract_using_columns(full_text),
+                    check=lambda found: _keys_match(doc["keys"])([r["Agreement Number"] for r in found]),
+                    repeat=repeat)
+            else:
+                rows, _ = timers["extract_using_ocr_layout"].measure(
+                    file_name, pages, lambda: extract_using_ocr_layout(ParsedDocument(pdf_bytes)),
+                    check=lambda found: _keys_match(doc["keys"])([r["Agreement Number"] for r in found[0]]),
+                    repeat=repeat)
+            extraction = {"category": "DMS", "waiver_details": rows}
+            timers["validate_waiver_request"].measure(
+                file_name, pages, lambda: validate_waiver_request(copy.deepcopy(extraction)),
+                check=lambda data: all(d["validation_status"] != "Error" for d in data["waiver_details"]),
+                repeat=repeat)
+        else:
+            extraction = timers["decode_and_extract_non_dms"].measure(
+                file_name, pages, lambda: decode_and_extract_non_dms(ParsedDocument(pdf_bytes), validate=False),
+                check=lambda data: _keys_match(doc["keys"])(data["metadata"]["fin_reference_no"]),
+                repeat=repeat)
+            timers["validate_non_dms_request"].measure(
+                file_name, pages, lambda: validate_non_dms_request(copy.deepcopy(extraction)),
+                check=lambda data: all(r["validation_status"] != "Error" for r in data["validation_results"]),
+                repeat=repeat)
+
+    index.close()
+    return {
+        "meta": {
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+            "git_commit": _git_commit(),
+            "pipeline_version": pipeline_version(),
+            "text_backend": TEXT_BACKEND,
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "corpus": os.path.abspath(corpus),
+            "corpus_seed": manifest.get("seed"),
+            "documents": len(documents),
+            "skip_ocr": skip_ocr,
+            "repeat": repeat,
+        },
+        "setup": setup,
+        "stages": {name: timer.summary() for name, timer in timers.items()},
+        "ocr": ocr_stats(),
+        "peak_rss_mb": _run_peak_rss_mb(),
+        "samples": {name: timer.samples for name, timer in timers.items() if timer.samples},
+    }
+
+
+def print_report(report):
+    print(f"\n{'stage':<28}{'calls':>6}{'mean ms':>10}{'p95 ms':>10}{'ms/page':>9}{'correct':>9}{'rss MB':>8}{'+MB':>7}")
+    for name, s in report["stages"].items():
+        if not s["calls"]:
+            continue
+        print(f"{name:<28}{s['calls']:>6}{s['mean_ms']:>10.1f}{s['p95_ms']:>10.1f}"
+              f"{s['ms_per_page'] or 0:>9.1f}{s['correct'] or '-':>9}{s['peak_rss_mb'] or '-':>8}{s['rss_growth_mb'] if s['rss_growth_mb'] is not None else '-':>7}")
+    print(f"--- setup: {report['setup']} | peak RSS {report['peak_rss_mb']} MB ---")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the pipeline stages on the synthetic corpus")
+    parser.add_argument("--corpus", default=os.path.join("benchmarks", "corpus"))
+    parser.add_argument("--output", default=None,
+                        help="JSON report path (default: benchmarks/results/<timestamp>.json)")
+    parser.add_argument("--skip-ocr", action="store_true", help="digital documents only")
+    parser.add_argument("--repeat", type=int, default=1, help="best of N calls per document and stage")
+    parser.add_argument("--tracemalloc", action="store_true", help="record the Python-heap peak per stage")
+    args = parser.parse_args()
+
+    if not os.path.exists(os.path.join(args.corpus, "manifest.json")):
+        from benchmarks.synthetic import generate_corpus
+        print(f"--- No corpus at {args.corpus}; generating the default one ---")
+        generate_corpus(args.corpus, raster=not args.skip_ocr)
+
+    report = run_benchmark(args.corpus, skip_ocr=args.skip_ocr, repeat=args.repeat,
+                           use_tracemalloc=args.tracemalloc)
+    print_report(report)
+    output = args.output or os.path.join("benchmarks", "results", time.strftime("%Y%m%d-%H%M%S") + ".json")
+    os.makedirs(os.path.dirname(output) or ".", exist_ok=True)
+    with open(output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"--- Report written to {output} ---")
@@ -0,0 +1,226 @@
+"""
+Reproducible synthetic corpus for the benchmarks: DMS waiver tables and non-DMS
+request emails, each as a digital PDF (real text layer) and a rasterized PDF
+(page images only, so the OCR paths run), plus matching SOA files.
+
+    python -m benchmarks.synthetic --out benchmarks/corpus --docs 20 --seed 7
+
+The corpus manifest records what every document should produce (category,
+agreement numbers / LANs), so benchmark runs can check correctness as well as speed.
+"""
+import argparse
+import json
+import os
+import random
+import string
+
+PAGE_WIDTH, PAGE_HEIGHT = 612, 792  # US Letter in points
+MARGIN = 48
+FONT_SIZE = 9
+LINE_HEIGHT = 13
+LINES_PER_PAGE = (PAGE_HEIGHT - 2 * MARGIN) // LINE_HEIGHT
+RASTER_DPI = 150
+
+# Column x positions (points) of the DMS waiver table
+DMS_COLUMNS = (MARGIN, MARGIN + 90, MARGIN + 160, MARGIN + 230, MARGIN + 320)
+
+REASONS = ["Customer hospitalised", "Salary delayed", "Bank mandate failure", "Covid hardship",
+           "ECS bounce due to technical issue", "Goodwill waiver", "Branch instruction"]
+FILLER = ("Please find below the details for your kind consideration. The customer has "
+          "requested relief on the charges levied on the account and has promised timely "
+          "payment going forward. Kindly review and confirm at the earliest.").split()
+
+
+# ---------------- CONTENT ---------------- #
+
+def _agreement_id(rng):
+    return "".join(rng.choice(string.ascii_uppercase + string.digits) for _ in range(8))
+
+
+def _lan(rng):
+    # Matches the non-DMS LAN pattern: letter, digit, letter, then 9-12 alphanumerics
+    tail = "".join(rng.choice(string.ascii_uppercase + string.digits) for _ in range(rng.randint(9, 12)))
+    return rng.choice(string.ascii_uppercase) + str(rng.randint(0, 9)) + rng.choice(string.ascii_uppercase) + tail
+
+
+def _timestamp(rng):
+    return f"2025-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d} {rng.randint(0, 23)}:{rng.randint(0, 59):02d}"
+
+
+def dms_document(rng, rows):
+    """Lines of a DMS approval mail with a waiver table; each table line is a list of cells."""
+    details = []
+    for _ in range(rows):
+        penal, bounce = rng.randint(0, 5000), rng.choice([0, 500, 590, 1180])
+        details.append([_agreement_id(rng), str(penal), str(bounce), str(penal + bounce), rng.choice(REASONS)])
+    lines = [
+        f"From  approver{rng.randint(1, 99)}@lender.example.com",
+        f"Date  {_timestamp(rng)}",
+        "Status: Approved by credit operations",
+        "",
+        ["Agreement", "Penal Charge", "Bounce Charge", "Total Waived", "Reason"],
+    ] + details
+    expected = {"category": "DMS", "keys": [d[0] for d in details],
+                "amounts": {d[0]: float(d[3]) for d in details}}
+    return lines, expected
+
+
+def non_dms_document(rng, lans, paragraphs):
+    """Lines of a customer waiver request mail referencing some LANs."""
+    loan_numbers = [_lan(rng) for _ in range(lans)]
+    lines = [
+        f"From: customer{rng.randint(1, 999)}@mail.example.com",
+        f"Date: {_timestamp(rng)}",
+        "To: collections@lender.example.com",
+        "Subject: Request for waiver of charges",
+        "",
+    ]
+    for paragraph in range(paragraphs):
+        words = [rng.choice(FILLER) for _ in range(rng.randint(40, 90))]
+        for start in range(0, len(words), 14):
+            lines.append(" ".join(words[start:start + 14]))
+        lines.append("")
+    lines += [f"LAN {lan}" for lan in loan_numbers]
+    expected = {"category": "Non-DMS", "keys": loan_numbers,
+                "amounts": {lan: float(rng.choice([0, rng.randint(100, 9000)])) for lan in loan_numbers}}
+    return lines, expected
+
+
+def paginate(lines):
+    return [lines[i:i + LINES_PER_PAGE] for i in range(0, len(lines), LINES_PER_PAGE)] or [[]]
+
+
+# ---------------- DIGITAL PDF ---------------- #
+
+def _pdf_string(text):
+    return "(" + text.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)") + ")"
+
+
+def _page_stream(page_lines):
+    ops = ["BT", f"/F1 {FONT_SIZE} Tf"]
+    for row, line in enumerate(page_lines):
+        y = PAGE_HEIGHT - MARGIN - row * LINE_HEIGHT
+        cells = line if isinstance(line, list) else [line]
+        for x, cell in zip(DMS_COLUMNS if isinstance(line, list) else (MARGIN,), cells):
+            if cell:
+                ops.append(f"1 0 0 1 {x} {y} Tm {_pdf_string(cell)} Tj")
+    ops.append("ET")
+    return "\n".join(ops).encode("latin-1")
+
+
+def write_digital_pdf(path, pages):
+    """Minimal PDF with a Helvetica text layer, written by hand so no PDF library is needed."""
+    objects = {1: b"<< /Type /Catalog /Pages 2 0 R >>",
+               3: b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica /Encoding /WinAnsiEncoding >>"}
+    kids = []
+    for i, page_lines in enumerate(pages):
+        page_id, content_id = 4 + 2 * i, 5 + 2 * i
+        stream = _page_stream(page_lines)
+        objects[content_id] = b"<< /Length %d >>\nstream\n%s\nendstream" % (len(stream), stream)
+        objects[page_id] = (f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 {PAGE_WIDTH} {PAGE_HEIGHT}] "
+                            f"/Resources << /Font << /F1 3 0 R >> >> /Contents {content_id} 0 R >>").encode()
+        kids.append(f"{page_id} 0 R")
+    objects[2] = f"<< /Type /Pages /Kids [{' '.join(kids)}] /Count {len(kids)} >>".encode()
+
+    out = bytearray(b"%PDF-1.4\n%\xe2\xe3\xcf\xd3\n")
+    offsets = {}
+    for obj_id in sorted(objects):
+        offsets[obj_id] = len(out)
+        out += b"%d 0 obj\n%s\nendobj\n" % (obj_id, objects[obj_id])
+    xref_at = len(out)
+    count = max(objects) + 1
+    out += b"xref\n0 %d\n0000000000 65535 f \n" % count
+    for obj_id in range(1, count):
+        out += b"%010d 00000 n \n" % offsets[obj_id]
+    out += b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (count, xref_at)
+    with open(path, "wb") as f:
+        f.write(out)
+
+
+# ---------------- RASTERIZED PDF ---------------- #
+
+def write_raster_pdf(path, pages, dpi=RASTER_DPI):
+    """Same layout drawn onto page images (no text layer), like a scanned document."""
+    from PIL import Image, ImageDraw, ImageFont
+
+    scale = dpi / 72
+    try:
+        font = ImageFont.load_default(size=int(FONT_SIZE * scale * 1.2))
+    except TypeError:  # Pillow < 10.1
+        font = ImageFont.load_default()
+    images = []
+    for page_lines in pages:
+        image = Image.new("L", (int(PAGE_WIDTH * scale), int(PAGE_HEIGHT * scale)), 255)
+        draw = ImageDraw.Draw(image)
+        for row, line in enumerate(page_lines):
+            top = (MARGIN + row * LINE_HEIGHT) * scale
+            cells = line if isinstance(line, list) else [line]
+            for x, cell in zip(DMS_COLUMNS if isinstance(line, list) else (MARGIN,), cells):
+                draw.text((x * scale, top), cell, fill=0, font=font)
+        images.append(image)
+    images[0].save(path, "PDF", resolution=dpi, save_all=True, append_images=images[1:])
+
+
+# ---------------- SOA FILES ---------------- #
+
+def write_soa_file(folder, key, total_overdue):
+    soa = {"statementOfAccount": {"finreference": key, "soa_summary_report": [
+        {"component": "total_overdue", "overdue": total_overdue},
+        {"component": "penal_charges", "overdue": round(total_overdue * 0.6, 2)},
+    ]}}
+    with open(os.path.join(folder, f"{key}.json"), "w") as f:
+        json.dump(soa, f)
+
+
+# ---------------- CORPUS ---------------- #
+
+def generate_corpus(out_dir, docs=20, seed=7, raster=True, max_rows=120, max_paragraphs=12):
+    """
+    Writes `docs` DMS and `docs` non-DMS documents (each digital, and rasterized when
+    `raster`) to out_dir/raw_files, their SOA files to out_dir/soa_database and a
+    manifest.json. Page and row counts vary from one to several pages per document.
+    """
+    rng = random.Random(seed)
+    raw_dir, soa_dir = os.path.join(out_dir, "raw_files"), os.path.join(out_dir, "soa_database")
+    os.makedirs(raw_dir, exist_ok=True)
+    os.makedirs(soa_dir, exist_ok=True)
+    manifest = {"seed": seed, "documents": []}
+
+    for i in range(docs):
+        for kind in ("dms", "non_dms"):
+            if kind == "dms":
+                lines, expected = dms_document(rng, rows=rng.randint(1, max_rows))
+            else:
+                lines, expected = non_dms_document(rng, lans=rng.randint(1, 4),
+                                                   paragraphs=rng.randint(1, max_paragraphs))
+            pages = paginate(lines)
+            for key, amount in expected["amounts"].items():
+                write_soa_file(soa_dir, key, amount)
+            layouts = ("digital", "raster") if raster else ("digital",)
+            for layout in layouts:
+                file_name = f"{kind}_{i:03d}_{layout}.pdf"
+                path = os.path.join(raw_dir, file_name)
+                if layout == "digital":
+                    write_digital_pdf(path, pages)
+                else:
+                    write_raster_pdf(path, pages)
+                manifest["documents"].append({
+                    "file_name": file_name, "kind": kind, "layout": layout, "pages": len(pages),
+                    "category": expected["category"], "keys": expected["keys"],
+                })
+
+    with open(os.path.join(out_dir, "manifest.json"), "w") as f:
+        json.dump(manifest, f, indent=2)
+    return manifest
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Generate the synthetic benchmark corpus")
+    parser.add_argument("--out", default=os.path.join("benchmarks", "corpus"))
+    parser.add_argument("--docs", type=int, default=20, help="documents per kind (DMS and non-DMS)")
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--no-raster", action="store_true", help="digital PDFs only (no Pillow needed)")
+    parser.add_argument("--max-rows", type=int, default=120, help="most waiver rows in one DMS document")
+    args = parser.parse_args()
+    manifest = generate_corpus(args.out, args.docs, args.seed, raster=not args.no_raster, max_rows=args.max_rows)
+    print(f"--- Wrote {len(manifest['documents'])} documents to {args.out} ---")
@@ -10,36 +10,46 @@ from typing import TypedDict, List, Optional
 from langgraph.graph import StateGraph, END
 
 # Import your existing logic nodes
-from src.utils.router import categorize_document
+from src.utils.router import route_document
 from src.utils.extractor import dms_extraction_logic
 from src.utils.non_dms_extractor import decode_and_extract_non_dms
-from src.utils.encoder import encode_all_raw_to_base64
+from src.utils.document import ParsedDocument
+from src.utils.instrumentation import instrument_node
 
 # 1. Define the State Structure [cite: 2025-12-15]
 class GraphState(TypedDict):
     current_file: str
     category: Optional[str]
     extracted_data: Optional[dict]
+    document: Optional[ParsedDocument]  # parsed once, reused by every node
+    routing: Optional[dict]  # confidence, pages examined and method behind the category
+    defer_validation: Optional[bool]  # validate later in one batch for the whole run
 
-# 2. Define the Nodes (Functions)
+# 2. Define the Nodes (Functions); each one is timed and measured per document
+@instrument_node("categorize_doc")
 def categorization_node(state: GraphState):
     print(f"--- Node: Categorizing {state['current_file']} ---")
-    raw_path = os.path.join("raw_files", state["current_file"])
-    with open(raw_path, "rb") as f:
-        pdf_bytes = f.read()
-    category = categorize_document(pdf_bytes)
-    return {"category": category}
+    document = state.get("document")
+    if document is None:
+        raw_path = os.path.join("raw_files", state["current_file"])
+        document = ParsedDocument.from_path(raw_path)
+    routing = route_document(document)
+    print(f"--- Routed as {routing['category']} (confidence {routing['confidence']}, "
+          f"pages {routing['pages_examined']}, {routing['method']}) ---")
+    return {"category": routing["category"], "routing": routing, "document": document}
 
+@instrument_node("dms_processor")
 def dms_node(state: GraphState):
     print("--- Node: Executing DMS Extraction ---")
-    result = dms_extraction_logic(state["current_file"])
+    result = dms_extraction_logic(state["current_file"], document=state.get("document"))
     return {"extracted_data": result}
 
+@instrument_node("non_dms_processor")
 def non_dms_node(state: GraphState):
     print("--- Node: Executing Non-DMS Extraction ---")
-    # Pointing to the encoded text file area
-    base64_path = os.path.join("data", "02_base64_encoded", state["current_file"].replace(".pdf", ".txt"))
-    result = decode_and_extract_non_dms(base64_path)
+    # Work on the parsed document in memory; fall back to the raw PDF
+    source = state.get("document") or os.path.join("raw_files", state["current_file"])
+    result = decode_and_extract_non_dms(source, validate=not state.get("defer_validation"))
     return {"extracted_data": result}
 
 # 3. Define Routing Logic
@@ -6,46 +6,229 @@ sys.modules["imghdr"] = imghdr
 # -----------------------------------
 from dotenv import load_dotenv
 load_dotenv()
-import json
+import time
+import signal
+import asyncio
+import argparse
 # Ensure the src folder is accessible for imports
 sys.path.append(os.path.join(os.getcwd(), 'src'))
 
-from langgraph_app import app # Import the compiled StateGraph [cite: 2025-12-15]
+from src.runner import safe_process_file, run_batch, validate_in_batches
+from src.async_runner import arun_batch, avalidate_in_batches
+from src.watcher import watch_folder
 from src.utils.encoder import encode_all_raw_to_base64
+from src.utils.result_cache import ResultCache
+from src.utils.checkpoints import open_checkpoints
+from src.utils.output_writer import OutputWriter
+from src.utils.soa_source import close_soa_source
 
-def run_agentic_automation():
-    # 1. First, encode all raw PDFs into Base64
-    encode_all_raw_to_base64()
+def run_agentic_automation(export_base64=False, use_cache=True, workers=1, warm_ocr=False,
+                           batch_validation=False, validation_chunk=1000, output_formats=None,
+                           use_checkpoints=False):
+    # 1. Optional: export Base64 copies of the raw PDFs (extraction reads the PDFs directly)
+    if export_base64:
+        encode_all_raw_to_base64()
     
     raw_folder = "raw_files"
-    output_folder = "data/03_decoded_output"
     
     if not os.path.exists(raw_folder):
         print(f"Error: {raw_folder} directory not found. Please create it and drop PDFs.")
         return
 
     files = [f for f in os.listdir(raw_folder) if f.endswith('.pdf')]
-    print(f"\n--- LangGraph Agentic Pipeline Started for {len(files)} files ---")
+    print(f"\n--- LangGraph Agentic Pipeline Started for {len(files)} files ({workers} worker(s)) ---")
+    start = time.perf_counter()
+    failures = 0
 
+    if workers > 1:
+        # Each worker process keeps its own warm OCR model and cache connection
+        results = run_batch(files, raw_folder=raw_folder, workers=workers,
+                            use_cache=use_cache, warm_ocr=warm_ocr, defer_validation=batch_validation,
+                            use_checkpoints=use_checkpoints)
+    else:
+        results = run_serial(files, raw_folder, use_cache, defer_validation=batch_validation,
+                             use_checkpoints=use_checkpoints)
+
+    validation_cache = validation_checkpoints = None
+    if batch_validation:
+        # SOA lookups for overlapping agreements are resolved once per chunk of documents
+        validation_cache = ResultCache() if use_cache else None
+        # Deferred documents keep their checkpoint threads until they validate
+        validation_checkpoints = open_checkpoints(use_checkpoints)
+        results = validate_in_batches(results, cache=validation_cache, chunk_size=validation_chunk,
+                                      checkpoints=validation_checkpoints)
+
+    with OutputWriter(output_formats) as writer:
+        for result in results:
+            file_name = result["file_name"]
+            if "error" in result:
+                failures += 1
+                print(f">>> Failed {file_name}: {result['error']}")
+                continue
+            if result["cache_hit"]:
+                print(f">>> Cache hit for {file_name} ({result['content_hash'][:12]})")
+
+            # 4. Save the finalized result (each configured output format, written once)
+            save_result(result, writer)
+
+    if validation_cache is not None:
+        validation_cache.close()
+    if validation_checkpoints is not None:
+        validation_checkpoints.close()
+    close_soa_source()
+
+    elapsed = time.perf_counter() - start
+    throughput = len(files) / elapsed if elapsed > 0 else 0.0
+    print(f"\n--- Processed {len(files)} files ({failures} failed) in {elapsed:.1f}s "
+          f"-> {throughput:.2f} docs/s ---")
+
+
+async def arun_agentic_automation(use_cache=True, concurrency=None, batch_validation=False,
+                                  validation_chunk=1000, output_formats=None):
+    """Asyncio variant: documents overlap on one event loop and report as each one finishes."""
+    raw_folder = "raw_files"
+
+    if not os.path.exists(raw_folder):
+        print(f"Error: {raw_folder} directory not found. Please create it and drop PDFs.")
+        return
+
+    files = [f for f in os.listdir(raw_folder) if f.endswith('.pdf')]
+    print(f"\n--- LangGraph Agentic Pipeline Started for {len(files)} files (async) ---")
+    start = time.perf_counter()
+    failures = 0
+    cache = ResultCache() if use_cache else None
+
+    results = arun_batch(files, raw_folder=raw_folder, cache=cache, concurrency=concurrency,
+                         defer_validation=batch_validation)
+    if batch_validation:
+        results = avalidate_in_batches(results, cache=cache, chunk_size=validation_chunk)
+
+    done = 0
+    with OutputWriter(output_formats) as writer:
+        async for result in results:
+            done += 1
+            print(f"[{done}/{len(files)}] {result['file_name']} ({result['seconds']:.1f}s)")
+            if "error" in result:
+                failures += 1
+                print(f">>> Failed {result['file_name']}: {result['error']}")
+                continue
+            await asyncio.to_thread(save_result, result, writer)
+
+    if cache is not None:
+        print(f"\n--- Result cache: {cache.stats()} ---")
+        cache.close()
+    close_soa_source()
+
+    elapsed = time.perf_counter() - start
+    throughput = len(files) / elapsed if elapsed > 0 else 0.0
+    print(f"\n--- Processed {len(files)} files ({failures} failed) in {elapsed:.1f}s "
+          f"-> {throughput:.2f} docs/s ---")
+
+
+def run_watch(use_cache=True, use_inotify=True, output_formats=None, use_checkpoints=False):
+    """Daemon mode: process each PDF as it lands in raw_files, then move it to raw_files/processed."""
+    cache = ResultCache() if use_cache else None
+    checkpoints = open_checkpoints(use_checkpoints)
+    # Parquet rows are flushed by size, by age (checked from the watch loop) and on shutdown
+    writer = OutputWriter(output_formats)
+
+    def on_result(result):
+        if "error" in result:
+            print(f">>> Failed {result['file_name']}: {result['error']}")
+        else:
+            save_result(result, writer)
+
+    def on_sigterm(signum, frame):
+        # Same shutdown as Ctrl-C, so buffered Parquet rows of already archived files are written
+        raise KeyboardInterrupt
+
+    previous_sigterm = signal.signal(signal.SIGTERM, on_sigterm)
+    try:
+        watch_folder("raw_files", on_result=on_result, cache=cache, use_inotify=use_inotify,
+                     checkpoints=checkpoints, on_tick=writer.flush_due,
+                     tick_seconds=max(1.0, writer.parquet_flush_seconds / 2))
+    except KeyboardInterrupt:
+        print("\n--- Watcher stopped ---")
+    finally:
+        signal.signal(signal.SIGTERM, previous_sigterm)
+        writer.close()
+        if cache is not None:
+            cache.close()
+        if checkpoints is not None:
+            checkpoints.close()
+        close_soa_source()
+
+
+def run_serial(files, raw_folder, use_cache, defer_validation=False, use_checkpoints=False):
+    cache = ResultCache() if use_cache else None
+    # Documents an interrupted run left unfinished resume after their last completed node
+    checkpoints = open_checkpoints(use_checkpoints)
     for file_name in files:
         print(f"\n>>> Starting Agent for: {file_name}")
         
-        # 2. Prepare the initial state for the document [cite: 2025-12-15]
-        initial_state = {"current_file": file_name}
-        
-        # 3. Invoke the LangGraph workflow
+        # 2-3. Invoke the LangGraph workflow (skipped when this content was already processed)
         # This will automatically categorize and extract based on your nodes [cite: 2025-12-15]
-        config = {"run_name": f"Processing_{file_name}"}
-        final_state = app.invoke(initial_state,config=config)
-        
-        # 4. Save the finalized JSON result
-        final_json_path = os.path.join(output_folder, file_name.replace(".pdf", ".json"))
-        os.makedirs(os.path.dirname(final_json_path), exist_ok=True)
-        
-        with open(final_json_path, "w") as f:
-            json.dump(final_state["extracted_data"], f, indent=4)
-            
-        print(f">>> Finished {file_name}. Recommendation: {final_state['extracted_data'].get('validation_results', [{}])[0].get('recommendation', 'Check DMS result')}")
+        yield safe_process_file(file_name, raw_folder=raw_folder, cache=cache,
+                                defer_validation=defer_validation, checkpoints=checkpoints)
+
+    if cache is not None:
+        print(f"\n--- Result cache: {cache.stats()} ---")
+        cache.close()
+    if checkpoints is not None:
+        print(f"--- Checkpoints: {checkpoints.stats()} ---")
+        checkpoints.close()
+
+
+def recommendation_of(extracted_data):
+    return (extracted_data.get('validation_results') or [{}])[0].get('recommendation', 'Check DMS result')
+
+
+def save_result(result, writer):
+    file_name = result["file_name"]
+    writer.write(result)
+
+    print(f">>> Finished {file_name}. Recommendation: {recommendation_of(result['extracted_data'])}")
 
 if __name__ == "__main__":
-    run_agentic_automation()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Run the waiver extraction pipeline over raw_files")
+    parser.add_argument("--export-base64", action="store_true",
+                        help="also write Base64 copies of the PDFs to data/02_base64_encoded")
+    parser.add_argument("--no-cache", action="store_true",
+                        help="reprocess every PDF instead of reusing cached results")
+    parser.add_argument("--workers", type=int, default=1,
+                        help="process files in parallel across this many worker processes")
+    parser.add_argument("--warm-ocr", action="store_true",
+                        help="load the OCR model in each worker up front instead of on first scanned page")
+    parser.add_argument("--batch-validation", action="store_true",
+                        help="validate against SOA in bulk per chunk of documents instead of per document")
+    parser.add_argument("--validation-chunk", type=int, default=1000,
+                        help="documents per bulk validation when --batch-validation is set")
+    parser.add_argument("--async", dest="use_async", action="store_true",
+                        help="run documents concurrently on an event loop, reporting each as it finishes")
+    parser.add_argument("--concurrency", type=int, default=None,
+                        help="documents in flight with --async (default ASYNC_CONCURRENCY or 8)")
+    parser.add_argument("--watch", action="store_true",
+                        help="keep running and process PDFs as they are dropped into raw_files")
+    parser.add_argument("--poll", action="store_true",
+                        help="with --watch, poll the folder instead of using inotify")
+    parser.add_argument("--output", default=None,
+                        help="comma-separated output formats: json, jsonl, parquet (default OUTPUT_FORMATS or json)")
+    parser.add_argument("--checkpoints", action="store_true",
+                        help="checkpoint the graph per document and node so an interrupted run resumes "
+                             "(worth it for scanned PDFs; needs langgraph-checkpoint-sqlite)")
+    args = parser.parse_args()
+    if args.watch:
+        run_watch(use_cache=not args.no_cache, use_inotify=not args.poll, output_formats=args.output,
+                  use_checkpoints=args.checkpoints)
+    elif args.use_async:
+        if args.export_base64:
+            encode_all_raw_to_base64()
+        asyncio.run(arun_agentic_automation(use_cache=not args.no_cache, concurrency=args.concurrency,
+                                            batch_validation=args.batch_validation,
+                                            validation_chunk=args.validation_chunk,
+                                            output_formats=args.output))
+    else:
+        run_agentic_automation(export_base64=args.export_base64, use_cache=not args.no_cache,
+                               workers=args.workers, warm_ocr=args.warm_ocr,
+                               batch_validation=args.batch_validation, validation_chunk=args.validation_chunk,
+                               output_formats=args.output, use_checkpoints=args.checkpoints)
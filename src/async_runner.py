@@ -0,0 +1,111 @@
+import asyncio
+import os
+import time
+
+from langgraph_app import app # Import the compiled StateGraph
+from src.runner import cached_result, initial_graph_state, graph_result, failed_result, apply_validation
+from src.utils.fileio import sha256_bytes
+from src.utils.instrumentation import document_span
+from src.utils.validator import avalidate_batch
+
+# Documents in flight at once on the event loop
+ASYNC_CONCURRENCY = int(os.getenv("ASYNC_CONCURRENCY", "8"))
+
+
+def _read_bytes(path):
+    with open(path, "rb") as f:
+        return f.read()
+
+
+async def aprocess_file(file_name, raw_folder="raw_files", cache=None, defer_validation=False):
+    """
+    process_file for the event loop. File reads, hashing and cache access run in threads;
+    the graph runs through ainvoke, which executes the (synchronous) nodes in an executor,
+    so one document's OCR overlaps other documents' I/O. Set OCR_PAGE_WORKERS > 1 to
+    move OCR itself into worker processes.
+    """
+    with document_span(file_name) as span:
+        start = time.perf_counter()
+        pdf_bytes = await asyncio.to_thread(_read_bytes, os.path.join(raw_folder, file_name))
+        content_hash = await asyncio.to_thread(sha256_bytes, pdf_bytes)
+
+        cached = await asyncio.to_thread(cache.get, content_hash) if cache is not None else None
+        if cached is not None:
+            result = cached_result(file_name, content_hash, cached, start)
+        else:
+            initial_state = initial_graph_state(file_name, pdf_bytes, defer_validation, span)
+            config = {"run_name": f"Processing_{file_name}"}
+            final_state = await app.ainvoke(initial_state, config=config)
+            result = graph_result(file_name, content_hash, final_state, defer_validation, start)
+            if cache is not None and not result["validation_deferred"]:
+                await asyncio.to_thread(cache.put, content_hash, final_state["category"],
+                                        final_state["extracted_data"])
+
+        span.mark(category=result["category"], cache_hit=result["cache_hit"], content_hash=content_hash)
+        return result
+
+
+async def asafe_process_file(file_name, raw_folder="raw_files", cache=None, defer_validation=False):
+    """aprocess_file that reports a failure in the result instead of raising."""
+    start = time.perf_counter()
+    try:
+        return await aprocess_file(file_name, raw_folder=raw_folder, cache=cache, defer_validation=defer_validation)
+    except Exception as e:
+        return failed_result(file_name, e, start)
+
+
+async def arun_batch(files, raw_folder="raw_files", cache=None, concurrency=None, defer_validation=False):
+    """
+    Runs files through the graph with at most `concurrency` documents in flight and
+    yields each result as soon as it finishes (completion order, not input order).
+    """
+    concurrency = concurrency or ASYNC_CONCURRENCY
+    pending_files = iter(files)
+    in_flight = set()
+
+    def start_next():
+        file_name = next(pending_files, None)
+        if file_name is not None:
+            in_flight.add(asyncio.create_task(
+                asafe_process_file(file_name, raw_folder=raw_folder, cache=cache,
+                                   defer_validation=defer_validation)))
+
+    for _ in range(concurrency):
+        start_next()
+    try:
+        while in_flight:
+            done, _ = await asyncio.wait(in_flight, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                in_flight.discard(task)
+                start_next()
+                yield task.result()
+    finally:
+        for task in in_flight:
+            task.cancel()
+
+
+async def avalidate_in_batches(results, cache=None, chunk_size=1000):
+    """
+    validate_in_batches for an async result stream: results that need no validation pass
+    straight through, deferred ones are validated with one non-blocking bulk SOA lookup
+    per chunk.
+    """
+    chunk = []
+    async for result in results:
+        if not result.get("validation_deferred"):
+            yield result
+            continue
+        chunk.append(result)
+        if len(chunk) >= chunk_size:
+            for validated in await _avalidate_chunk(chunk, cache):
+                yield validated
+            chunk = []
+    if chunk:
+        for validated in await _avalidate_chunk(chunk, cache):
+            yield validated
+
+
+async def _avalidate_chunk(chunk, cache):
+    errors = await avalidate_batch([r["extracted_data"] for r in chunk])
+    await asyncio.to_thread(apply_validation, chunk, errors, cache)
+    return chunk
@@ -0,0 +1,288 @@
+import os
+import time
+import traceback
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+from langgraph_app import app, workflow # Import the compiled StateGraph
+from src.utils.checkpoints import open_checkpoints
+from src.utils.document import ParsedDocument
+from src.utils.fileio import sha256_bytes
+from src.utils.instrumentation import document_span
+from src.utils.ocr_engine import warm_up
+from src.utils.result_cache import ResultCache
+from src.utils.soa_index import use_prebuilt_soa_index
+from src.utils.soa_source import prepare_soa_for_workers
+from src.utils.validator import validate_batch
+
+
+def process_file(file_name, raw_folder="raw_files", cache=None, defer_validation=False, checkpoints=None):
+    """
+    Runs one PDF through the graph, or returns the cached result for identical content.
+    defer_validation: leave SOA validation to validate_in_batches; the result is cached there.
+    checkpoints: a GraphCheckpoints to resume documents an earlier run did not finish.
+    """
+    # Per-document metrics (node timings, pages, cache hits) go to the instrumentation sinks
+    with document_span(file_name) as span:
+        result = _process_file(file_name, raw_folder, cache, defer_validation, span, checkpoints)
+        span.mark(category=result["category"], cache_hit=result["cache_hit"],
+                  content_hash=result["content_hash"])
+        return result
+
+
+def process_pdf_bytes(pdf_bytes, file_name, cache=None, defer_validation=False, checkpoints=None):
+    """process_file for a PDF already in memory (e.g. received over the network)."""
+    with document_span(file_name) as span:
+        result = _process_bytes(pdf_bytes, file_name, cache, defer_validation, span, time.perf_counter(),
+                                checkpoints)
+        span.mark(category=result["category"], cache_hit=result["cache_hit"],
+                  content_hash=result["content_hash"])
+        return result
+
+
+def _process_file(file_name, raw_folder, cache, defer_validation, span, checkpoints=None):
+    start = time.perf_counter()
+    raw_path = os.path.join(raw_folder, file_name)
+    with open(raw_path, "rb") as f:
+        pdf_bytes = f.read()
+    return _process_bytes(pdf_bytes, file_name, cache, defer_validation, span, start, checkpoints, raw_path)
+
+
+def _process_bytes(pdf_bytes, file_name, cache, defer_validation, span, start, checkpoints=None,
+                   source_path=None):
+    content_hash = sha256_bytes(pdf_bytes)
+
+    cached = cache.get(content_hash) if cache is not None else None
+    if cached is not None:
+        return cached_result(file_name, content_hash, cached, start)
+
+    config = {"run_name": f"Processing_{file_name}"}
+    if checkpoints is None:
+        initial_state = initial_graph_state(file_name, pdf_bytes, defer_validation, span, source_path)
+        final_state = app.invoke(initial_state, config=config)
+    else:
+        final_state = _invoke_checkpointed(file_name, pdf_bytes, content_hash, defer_validation, span,
+                                           checkpoints, config, source_path)
+    result = graph_result(file_name, content_hash, final_state, defer_validation, start)
+
+    if cache is not None and not result["validation_deferred"]:
+        cache.put(content_hash, final_state["category"], final_state["extracted_data"])
+    if checkpoints is not None:
+        thread_id = config["configurable"]["thread_id"]
+        if result["validation_deferred"]:
+            # Kept until apply_validation succeeds, so a crash before the batch does not redo extraction
+            result["checkpoint_thread"] = thread_id
+        else:
+            checkpoints.finish(thread_id)
+    return result
+
+
+def _invoke_checkpointed(file_name, pdf_bytes, content_hash, defer_validation, span, checkpoints, config,
+                         source_path=None):
+    """
+    Runs the graph on the document's checkpoint thread: an interrupted thread continues after
+    its last completed node, a deferred one that finished but was never validated returns its
+    final state, and anything else starts fresh.
+    """
+    graph = checkpoints.compile(workflow)
+    thread_id = checkpoints.thread_id(content_hash, file_name, defer_validation)
+    config["configurable"] = {"thread_id": thread_id}
+    snapshot = graph.get_state(config)
+    if snapshot.next:
+        print(f"--- Resuming {file_name} at {', '.join(snapshot.next)} ---")
+        checkpoints.resumed += 1
+        document = snapshot.values.get("document")
+        if document is not None and source_path and document.source_path != source_path:
+            # The file moved since the checkpoint; its bytes are re-read from where it is now
+            document.source_path = source_path
+            graph.update_state(config, {"document": document})
+        span.document = document
+        # Checkpoints are committed before the next node starts, so an OOM kill loses at most one node
+        return graph.invoke(None, config=config, durability="sync")
+    if snapshot.values:
+        if defer_validation and snapshot.values.get("category") != "DMS":
+            print(f"--- {file_name} finished extraction in an earlier run; validating it now ---")
+            checkpoints.reused += 1
+            span.document = snapshot.values.get("document")
+            return snapshot.values
+        checkpoints.finish(thread_id)
+    initial_state = initial_graph_state(file_name, pdf_bytes, defer_validation, span, source_path)
+    return graph.invoke(initial_state, config=config, durability="sync")
+
+
+def cached_result(file_name, content_hash, cached, start):
+    return {
+        "file_name": file_name,
+        "content_hash": content_hash,
+        "category": cached["category"],
+        "extracted_data": cached["extracted_data"],
+        "cache_hit": True,
+        "seconds": time.perf_counter() - start,
+    }
+
+
+def initial_graph_state(file_name, pdf_bytes, defer_validation, span, source_path=None):
+    # Prepare the initial state for the document; the parsed PDF is shared by every node
+    span.document = ParsedDocument(pdf_bytes, file_name=file_name, source_path=source_path)
+    return {"current_file": file_name, "document": span.document, "defer_validation": defer_validation}
+
+
+def graph_result(file_name, content_hash, final_state, defer_validation, start):
+    # Only the Non-DMS node validates inside the graph, so only its results wait for the batch
+    deferred = defer_validation and final_state["category"] != "DMS"
+    return {
+        "file_name": file_name,
+        "content_hash": content_hash,
+        "category": final_state["category"],
+        "extracted_data": final_state["extracted_data"],
+        "cache_hit": False,
+        "validation_deferred": deferred,
+        "seconds": time.perf_counter() - start,
+    }
+
+
+def failed_result(file_name, error, start):
+    return {
+        "file_name": file_name,
+        "error": f"{type(error).__name__}: {error}",
+        "traceback": traceback.format_exc(),
+        "cache_hit": False,
+        "seconds": time.perf_counter() - start,
+    }
+
+
+def safe_process_file(file_name, raw_folder="raw_files", cache=None, defer_validation=False, checkpoints=None):
+    """process_file that reports a failure in the result instead of raising, so a batch keeps going."""
+    start = time.perf_counter()
+    try:
+        return process_file(file_name, raw_folder=raw_folder, cache=cache, defer_validation=defer_validation,
+                            checkpoints=checkpoints)
+    except Exception as e:
+        return failed_result(file_name, e, start)
+
+
+# ---------------- PARALLEL BATCH ---------------- #
+
+_worker_cache = None
+_worker_checkpoints = None
+
+
+def _init_worker(use_cache, warm_ocr, use_checkpoints=False, soa_prebuilt=False):
+    """Runs once per worker process: its cache connection and OCR model are reused for every document."""
+    global _worker_cache, _worker_checkpoints
+    if soa_prebuilt:
+        use_prebuilt_soa_index()
+    _worker_cache = ResultCache() if use_cache else None
+    _worker_checkpoints = open_checkpoints(use_checkpoints)
+    if warm_ocr:
+        warm_up()
+
+
+def _process_in_worker(file_name, raw_folder, defer_validation):
+    return safe_process_file(file_name, raw_folder=raw_folder, cache=_worker_cache,
+                             defer_validation=defer_validation, checkpoints=_worker_checkpoints)
+
+
+def run_batch(files, raw_folder="raw_files", workers=None, use_cache=True, warm_ocr=False,
+              defer_validation=False, use_checkpoints=False):
+    """
+    Processes files across a pool of worker processes and yields results in input order.
+    If a worker dies (e.g. OOM-killed), files that had already finished keep their results,
+    the files that may have been in flight are rerun one per process so only the one that
+    kills its worker is reported as failed, and the rest continue on a fresh pool. With
+    use_checkpoints, a rerun file resumes after its last finished node.
+    """
+    workers = workers or os.cpu_count()
+    files = list(files)
+    # The SOA index is built here once; workers racing to build it would hit "database is locked"
+    worker_args = (use_cache, warm_ocr, use_checkpoints, prepare_soa_for_workers())
+    results = {}
+    next_index = 0
+    pending = list(range(len(files)))
+    while pending:
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                 initargs=worker_args) as executor:
+            futures = {index: executor.submit(_process_in_worker, files[index], raw_folder, defer_validation)
+                       for index in pending}
+            broken = False
+            for index in pending:
+                try:
+                    results[index] = futures[index].result()
+                except BrokenProcessPool:
+                    broken = True
+                    break
+                while next_index in results:
+                    yield results.pop(next_index)
+                    next_index += 1
+        if not broken:
+            break
+
+        # Every unfinished future fails with the pool; keep the ones that completed out of order
+        unfinished = []
+        for index in pending:
+            future = futures[index]
+            if index in results or index < next_index:
+                continue
+            if future.done() and not future.cancelled() and future.exception() is None:
+                results[index] = future.result()
+            else:
+                unfinished.append(index)
+        # Work is handed out in submission order, so the dead worker held one of the first
+        # unfinished files (at most one per worker plus the one queued for the next free worker)
+        suspects, pending = unfinished[:workers + 1], unfinished[workers + 1:]
+        print(f"--- Worker pool broke; rerunning {len(suspects)} file(s) one per process ---")
+        for index in suspects:
+            results[index] = _run_isolated(files[index], raw_folder, defer_validation, worker_args)
+        while next_index in results:
+            yield results.pop(next_index)
+            next_index += 1
+
+
+def _run_isolated(file_name, raw_folder, defer_validation, worker_args):
+    """Runs one file in a process of its own so a crash cannot take other files down with it."""
+    with ProcessPoolExecutor(max_workers=1, initializer=_init_worker, initargs=worker_args) as executor:
+        try:
+            return executor.submit(_process_in_worker, file_name, raw_folder, defer_validation).result()
+        except BrokenProcessPool as e:
+            return {"file_name": file_name, "error": f"Worker died: {e}", "cache_hit": False, "seconds": 0.0}
+
+
+# ---------------- BATCHED VALIDATION ---------------- #
+
+def validate_in_batches(results, cache=None, chunk_size=1000, checkpoints=None):
+    """
+    Validates deferred results chunk by chunk with one bulk SOA lookup per chunk,
+    caches them, and yields every result in its original order.
+    checkpoints: drops the checkpoint threads the deferred documents kept for validation.
+    """
+    chunk = []
+    for result in results:
+        chunk.append(result)
+        if len(chunk) >= chunk_size:
+            yield from _validate_chunk(chunk, cache, checkpoints)
+            chunk = []
+    if chunk:
+        yield from _validate_chunk(chunk, cache, checkpoints)
+
+
+def _validate_chunk(chunk, cache, checkpoints=None):
+    pending = [r for r in chunk if r.get("validation_deferred")]
+    if pending:
+        errors = validate_batch([r["extracted_data"] for r in pending])
+        apply_validation(pending, errors, cache, checkpoints)
+    yield from chunk
+
+
+def apply_validation(pending, errors, cache, checkpoints=None):
+    for result, error in zip(pending, errors):
+        result["validation_deferred"] = False
+        # A failed validation keeps its thread, so the next run validates again without re-extracting
+        thread_id = result.pop("checkpoint_thread", None)
+        if error:
+            result["error"] = f"Validation failed: {error}"
+            continue
+        if cache is not None:
+            cache.put(result["content_hash"], result["category"], result["extracted_data"])
+        if checkpoints is not None and thread_id:
+            checkpoints.finish(thread_id)
+    print(f"--- Batch-validated {len(pending)} documents ---")
@@ -0,0 +1,230 @@
+"""
+Long-running extraction service: the graph is compiled and the OCR model loaded once,
+then a preforked pool of workers shares them copy-on-write and serves requests on
+one listening socket (TCP or Unix).
+
+    python -m src.service --port 8090 --workers 4
+    curl --data-binary @raw_files/mail.pdf -H "Content-Type: application/pdf" \
+         "http://127.0.0.1:8090/extract?file_name=mail.pdf"
+
+    python -m src.service --unix-socket /run/waiver/extract.sock
+    curl --unix-socket /run/waiver/extract.sock --data-binary @mail.pdf http://localhost/extract
+
+POST /extract returns the same JSON that run_agentic_automation writes for the file;
+GET /healthz reports the worker's pid, document count and OCR stats.
+"""
+import argparse
+import json
+import os
+import signal
+import socket
+import sys
+import time
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from urllib.parse import parse_qs, urlparse
+
+# Compiling the graph imports the extractors (and the imghdr shim) once, before forking
+from src.runner import process_pdf_bytes
+from src.utils.instrumentation import close_sinks
+from src.utils.ocr_engine import ocr_stats, warm_up
+from src.utils.result_cache import ResultCache
+from src.utils.soa_index import use_prebuilt_soa_index
+from src.utils.soa_source import close_soa_source, prepare_soa_for_workers
+
+SERVICE_MAX_BODY_MB = float(os.getenv("SERVICE_MAX_BODY_MB", "100"))
+# Workers are recycled after this many requests to return leaked memory (0 = never)
+SERVICE_MAX_REQUESTS = int(os.getenv("SERVICE_MAX_REQUESTS", "0"))
+# A worker serves one connection at a time, so an idle keep-alive client is dropped after this
+SERVICE_KEEPALIVE_SECONDS = float(os.getenv("SERVICE_KEEPALIVE_SECONDS", "2"))
+
+
+class ExtractionHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep-alive for callers sending documents one after another
+    server_version = "WaiverExtraction/1.0"
+    timeout = SERVICE_KEEPALIVE_SECONDS  # also bounds a stalled upload
+
+    def do_GET(self):
+        if urlparse(self.path).path != "/healthz":
+            return self._send_json(404, {"error": "Not found"})
+        self._send_json(200, {"status": "ok", "pid": os.getpid(),
+                              "documents": self.server.documents, "ocr": ocr_stats()})
+
+    def do_POST(self):
+        url = urlparse(self.path)
+        if url.path != "/extract":
+            return self._send_json(404, {"error": "Not found"})
+        length = int(self.headers.get("Content-Length") or 0)
+        # The body is left unread in both cases, so the connection cannot carry another request
+        if length <= 0:
+            return self._send_json(400, {"error": "Request body must be the PDF bytes"}, close=True)
+        if length > SERVICE_MAX_BODY_MB * 1024 * 1024:
+            return self._send_json(413, {"error": f"PDF larger than {SERVICE_MAX_BODY_MB} MB"}, close=True)
+        pdf_bytes = self.rfile.read(length)
+        if not pdf_bytes.startswith(b"%PDF-"):
+            return self._send_json(400, {"error": "Request body is not a PDF"})
+
+        file_name = parse_qs(url.query).get("file_name", ["upload.pdf"])[0]
+        self.server.documents += 1
+        # A worker due for recycling closes the connection so it can exit after this response
+        recycle = self.server.recycle_due()
+        try:
+            result = process_pdf_bytes(pdf_bytes, os.path.basename(file_name), cache=self.server.cache)
+        except Exception as e:
+            return self._send_json(500, {"error": f"{type(e).__name__}: {e}"}, close=recycle)
+
+        self._send_json(200, result["extracted_data"], close=recycle, headers={
+            "X-Category": result["category"],
+            "X-Cache-Hit": str(result["cache_hit"]).lower(),
+            "X-Processing-Seconds": f"{result['seconds']:.3f}",
+        })
+
+    def _send_json(self, status, payload, headers=None, close=False):
+        body = json.dumps(payload, indent=4).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        if close:
+            self.send_header("Connection", "close")  # also sets close_connection
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def address_string(self):
+        # Unix-socket peers have no address
+        return self.client_address[0] if self.client_address else "unix"
+
+    def log_message(self, format, *args):
+        print(f"[worker {os.getpid()}] {self.address_string()} {format % args}")
+
+
+class _SharedSocketServer(HTTPServer):
+    """HTTPServer on a socket that was bound by the parent before forking."""
+
+    def __init__(self, sock, cache, max_requests=0):
+        self.address_family = sock.family
+        super().__init__(sock.getsockname(), ExtractionHandler, bind_and_activate=False)
+        self.socket.close()
+        self.socket = sock
+        self.cache = cache
+        self.max_requests = max_requests
+        self.documents = 0
+
+    def recycle_due(self):
+        return bool(self.max_requests) and self.documents >= self.max_requests
+
+
+def _listen(host, port, unix_socket):
+    if unix_socket:
+        if os.path.exists(unix_socket):
+            os.remove(unix_socket)
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        sock.bind(unix_socket)
+    else:
+        sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        sock.bind((host, port))
+    sock.listen(128)
+    return sock
+
+
+def _worker(sock, use_cache, max_requests):
+    """Child process: serves requests until told to stop or recycled after max_requests."""
+    signal.signal(signal.SIGTERM, lambda *_: sys.exit(0))
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    # SQLite connections must not cross a fork, so each worker opens its own
+    cache = ResultCache() if use_cache else None
+    server = _SharedSocketServer(sock, cache, max_requests)
+    print(f"--- Worker {os.getpid()} ready ---")
+    try:
+        # One connection per call; the handler closes a keep-alive connection once the limit is hit
+        while not server.recycle_due():
+            server.handle_request()
+    finally:
+        if cache is not None:
+            cache.close()
+        close_soa_source()
+        # The worker leaves through os._exit, so its metrics file is removed here
+        close_sinks()
+    print(f"--- Worker {os.getpid()} recycled after {server.documents} documents ---")
+
+
+def _spawn(sock, use_cache, max_requests):
+    pid = os.fork()
+    if pid == 0:
+        code = 0
+        try:
+            _worker(sock, use_cache, max_requests)
+        except SystemExit as e:
+            code = e.code or 0
+        except BaseException:
+            import traceback
+            traceback.print_exc()
+            code = 1
+        os._exit(code)
+    return pid
+
+
+def serve(host="127.0.0.1", port=8090, unix_socket=None, workers=2, use_cache=True,
+          preload_ocr=True, max_requests=SERVICE_MAX_REQUESTS):
+    """
+    Binds the socket, loads the OCR model once and forks `workers` children that
+    inherit it. Dead or recycled workers are replaced until SIGTERM/SIGINT.
+    """
+    if preload_ocr:
+        # Loaded before fork so every worker shares the model pages copy-on-write
+        stats = warm_up()
+        print(f"--- OCR model preloaded ({stats.get('model_rss_mb')} MB) ---")
+    if prepare_soa_for_workers():
+        # Built once here; forked workers inherit the flag and only read the index
+        use_prebuilt_soa_index()
+    sock = _listen(host, port, unix_socket)
+    where = unix_socket or f"http://{host}:{sock.getsockname()[1]}"
+    print(f"--- Extraction service listening on {where} with {workers} worker(s) ---")
+
+    children = {_spawn(sock, use_cache, max_requests) for _ in range(workers)}
+    stopping = False
+
+    def stop(*_):
+        nonlocal stopping
+        stopping = True
+        for pid in children:
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+    signal.signal(signal.SIGTERM, stop)
+    signal.signal(signal.SIGINT, stop)
+    try:
+        while children:
+            try:
+                pid, status = os.wait()
+            except ChildProcessError:
+                break
+            children.discard(pid)
+            if not stopping:
+                print(f"--- Worker {pid} exited ({os.waitstatus_to_exitcode(status)}); starting a replacement ---")
+                time.sleep(0.5)  # avoid a tight respawn loop if workers die on start
+                children.add(_spawn(sock, use_cache, max_requests))
+    finally:
+        sock.close()
+        if unix_socket and os.path.exists(unix_socket):
+            os.remove(unix_socket)
+    print("--- Extraction service stopped ---")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Serve the extraction pipeline over HTTP with warm workers")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8090)
+    parser.add_argument("--unix-socket", default=None, help="listen on this Unix socket path instead of TCP")
+    parser.add_argument("--workers", type=int, default=2, help="preforked worker processes")
+    parser.add_argument("--no-cache", action="store_true", help="do not reuse cached results")
+    parser.add_argument("--no-preload", action="store_true",
+                        help="load the OCR model lazily in each worker instead of once before forking")
+    parser.add_argument("--max-requests", type=int, default=SERVICE_MAX_REQUESTS,
+                        help="recycle a worker after this many documents (0 = never)")
+    args = parser.parse_args()
+    serve(host=args.host, port=args.port, unix_socket=args.unix_socket, workers=args.workers,
+          use_cache=not args.no_cache, preload_ocr=not args.no_preload, max_requests=args.max_requests)
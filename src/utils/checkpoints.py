@@ -0,0 +1,71 @@
+import os
+import sqlite3
+
+try:
+    from .versions import pipeline_version
+except ImportError:
+    from versions import pipeline_version
+
+DEFAULT_CHECKPOINT_PATH = os.getenv("PIPELINE_CHECKPOINT_DB", os.path.join("data", "cache", "checkpoints.sqlite"))
+
+
+class GraphCheckpoints:
+    """
+    Local SQLite checkpointer for the compiled graph. Every document runs on its own
+    thread (pipeline version + content hash + file name), and a checkpoint is committed after each
+    node, so a document interrupted after categorize_doc resumes at its extraction
+    node with the parsed text and OCR tokens it already had. Threads are deleted once
+    the document is done; threads from other pipeline versions are purged on open.
+    """
+
+    def __init__(self, path=DEFAULT_CHECKPOINT_PATH, version=None):
+        from langgraph.checkpoint.serde.jsonplus import JsonPlusSerializer
+        from langgraph.checkpoint.sqlite import SqliteSaver
+
+        self.path = path
+        self.version = version or pipeline_version()
+        self.resumed = 0
+        self.reused = 0
+        self._graphs = {}
+
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._conn = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        # ParsedDocument is not JSON/msgpack serializable; the database is local to this machine
+        self.saver = SqliteSaver(self._conn, serde=JsonPlusSerializer(pickle_fallback=True))
+        self.saver.setup()
+        with self._conn:
+            for table in ("checkpoints", "writes"):
+                self._conn.execute(f"DELETE FROM {table} WHERE thread_id NOT LIKE ?", (f"{self.version}|%",))
+
+    def compile(self, workflow):
+        """The workflow compiled against this checkpointer (compiled once per workflow)."""
+        if id(workflow) not in self._graphs:
+            self._graphs[id(workflow)] = workflow.compile(checkpointer=self.saver)
+        return self._graphs[id(workflow)]
+
+    def thread_id(self, content_hash, file_name, defer_validation=False):
+        # Identical attachments under different names run concurrently on threads of their own;
+        # a run that defers validation stops with unvalidated data, so it is kept apart from inline runs
+        return f"{self.version}|{content_hash}|{file_name}|{'deferred' if defer_validation else 'inline'}"
+
+    def finish(self, thread_id):
+        """Drops a document's checkpoints once its result no longer depends on them."""
+        self.saver.delete_thread(thread_id)
+
+    def stats(self):
+        (threads,) = self._conn.execute("SELECT COUNT(DISTINCT thread_id) FROM checkpoints").fetchone()
+        return {"threads": threads, "resumed": self.resumed, "reused": self.reused, "version": self.version}
+
+    def close(self):
+        self._conn.close()
+
+
+def open_checkpoints(enabled=True):
+    """GraphCheckpoints when enabled and langgraph-checkpoint-sqlite is installed, otherwise None."""
+    if not enabled:
+        return None
+    try:
+        return GraphCheckpoints()
+    except ImportError:
+        print("--- langgraph-checkpoint-sqlite not installed; running without checkpoints ---")
+        return None
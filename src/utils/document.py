@@ -0,0 +1,236 @@
+import base64
+import os
+from collections import deque
+from pdf2image import pdfinfo_from_bytes
+
+try:
+    from .ocr_engine import ocr_image_tokens, submit_ocr, result_tokens, OCR_BATCHING
+    from .ocr_batcher import OCR_BATCH_MAX_PAGES
+    from .page_pool import ocr_pages, OCR_PAGE_WORKERS
+    from .rasterize import render_page, iter_page_images
+    from .roi_ocr import roi_ocr_page
+    from .text_backends import open_text_backend
+    from .instrumentation import track
+except ImportError:
+    from ocr_engine import ocr_image_tokens, submit_ocr, result_tokens, OCR_BATCHING
+    from ocr_batcher import OCR_BATCH_MAX_PAGES
+    from page_pool import ocr_pages, OCR_PAGE_WORKERS
+    from rasterize import render_page, iter_page_images
+    from roi_ocr import roi_ocr_page
+    from text_backends import open_text_backend
+    from instrumentation import track
+
+OCR_DPI = 300
+# A page needs at least this many non-blank characters for its text layer to be trusted
+TEXT_LAYER_MIN_CHARS = int(os.getenv("TEXT_LAYER_MIN_CHARS", "10"))
+
+
+class ParsedDocument:
+    """
+    A PDF parsed once per file and shared by the router and the extractors.
+    The text layer and OCR tokens are computed on first use and cached; page images
+    are rendered one page at a time and dropped once OCR'd to keep memory bounded.
+    """
+
+    def __init__(self, pdf_bytes, file_name=None, text_backend=None, source_path=None):
+        self._pdf_bytes = pdf_bytes
+        self.file_name = file_name
+        self.source_path = source_path  # where pdf_bytes can be read again, if they came from a file
+        self.text_backend = text_backend  # None: TEXT_BACKEND
+        self._pdf = None         # text backend handle, kept open while pages are read lazily
+        self._page_texts = None  # per page: text, or None until that page has been read
+        self._page_image_counts = None
+        self._ocr_tokens = {}    # (page_index, dpi) -> [(box, text, conf), ...]
+        self._roi_tokens = {}    # (page_index, dpi) -> tokens from the table/header bands only
+        self._raster_page_count = None
+        self.roi_stats = {"pages": 0, "pixels_total": 0, "pixels_ocr": 0, "pixels_skipped": 0}
+
+    @classmethod
+    def from_path(cls, path):
+        with open(path, "rb") as f:
+            return cls(f.read(), file_name=os.path.basename(path), source_path=path)
+
+    @property
+    def pdf_bytes(self):
+        if self._pdf_bytes is None:
+            # Restored from a checkpoint without its bytes: read the file again
+            with open(self.source_path, "rb") as f:
+                self._pdf_bytes = f.read()
+        return self._pdf_bytes
+
+    def __repr__(self):
+        size = f"{len(self._pdf_bytes)} bytes" if self._pdf_bytes is not None else "bytes not loaded"
+        return f"ParsedDocument({self.file_name!r}, {size})"
+
+    def __getstate__(self):
+        # Graph checkpoints keep the text and OCR tokens read so far; the backend handle is reopened on demand
+        state = dict(self.__dict__)
+        state["_pdf"] = None
+        if self.source_path:  # the PDF itself is re-read from disk rather than stored in every checkpoint
+            state["_pdf_bytes"] = None
+        return state
+
+    # ---------------- TEXT LAYER ---------------- #
+
+    def _open_pdf(self):
+        if self._pdf is None:
+            self._pdf = open_text_backend(self.pdf_bytes, self.text_backend)
+            if self._page_texts is None:  # pages restored from a checkpoint are not read again
+                self._page_texts = [None] * self._pdf.page_count()
+                self._page_image_counts = [None] * self._pdf.page_count()
+        return self._pdf
+
+    def page_text(self, page_index):
+        """Text layer of one page, read on demand so callers can stop early."""
+        if self._page_texts is None or self._page_texts[page_index] is None:
+            with track("text_layer"):
+                text, image_count = self._open_pdf().read_page(page_index)
+            self._page_texts[page_index] = text
+            self._page_image_counts[page_index] = image_count
+            if all(t is not None for t in self._page_texts):
+                self._close_pdf()
+        return self._page_texts[page_index]
+
+    def _close_pdf(self):
+        if self._pdf is not None:
+            self._pdf.close()
+            self._pdf = None
+
+    @property
+    def page_texts(self):
+        """Per-page text layer ('' for pages without one)."""
+        if self._page_texts is None or None in self._page_texts:
+            for page_index in range(self.page_count):
+                self.page_text(page_index)
+        return self._page_texts
+
+    @property
+    def page_count(self):
+        if self._page_texts is None:
+            self._open_pdf()
+        return len(self._page_texts)
+
+    @property
+    def has_text_layer(self):
+        return any(t.strip() for t in self.page_texts)
+
+    def page_has_text(self, page_index):
+        return len(self.page_texts[page_index].strip()) >= TEXT_LAYER_MIN_CHARS
+
+    @property
+    def ocr_page_indexes(self):
+        """
+        Pages that need OCR because they have no usable text layer.
+        When other pages carry text, blank pages without any image are left out.
+        """
+        if not self.has_text_layer:
+            return list(range(self.page_count))
+        return [i for i in range(self.page_count)
+                if not self.page_has_text(i) and self._page_image_counts[i]]
+
+    @property
+    def full_text(self):
+        """Text layer of all pages that have one, newline-terminated per page."""
+        return "".join(t + "\n" for t in self.page_texts if t.strip())
+
+    # ---------------- RASTER + OCR ---------------- #
+
+    def render_page(self, page_index, dpi=OCR_DPI):
+        return render_page(self.pdf_bytes, page_index, dpi=dpi)
+
+    def ocr_tokens(self, page_index, dpi=OCR_DPI):
+        """OCR lines of one page as (box, text, confidence) tuples."""
+        key = (page_index, dpi)
+        if key not in self._ocr_tokens:
+            img = self.render_page(page_index, dpi) if page_index < self.raster_page_count() else None
+            self._ocr_tokens[key] = ocr_image_tokens(img) if img is not None else []
+        return self._ocr_tokens[key]
+
+    def roi_ocr_tokens(self, page_index, dpi=OCR_DPI):
+        """
+        Tokens from the table and header regions only (two-pass ROI OCR).
+        A full-page OCR already cached for this page (e.g. by the router) is reused as is.
+        """
+        key = (page_index, dpi)
+        if key in self._ocr_tokens:
+            return self._ocr_tokens[key]
+        if key not in self._roi_tokens:
+            tokens, stats = roi_ocr_page(self.pdf_bytes, page_index, dpi=dpi)
+            self.roi_stats["pages"] += 1
+            for name in ("pixels_total", "pixels_ocr", "pixels_skipped"):
+                self.roi_stats[name] += stats[name]
+            self._roi_tokens[key] = tokens
+        return self._roi_tokens[key]
+
+    def ocr_page_text(self, page_index, dpi=OCR_DPI):
+        return " ".join(text for _, text, _ in self.ocr_tokens(page_index, dpi))
+
+    def prefetch_ocr(self, page_indexes=None, dpi=OCR_DPI, workers=None):
+        """
+        OCRs every missing page in one go, spreading pages across the page pool
+        when more than one worker is configured. Results land in the token cache.
+        """
+        workers = workers or OCR_PAGE_WORKERS
+        if page_indexes is None:
+            page_indexes = range(self.raster_page_count())
+        missing = [i for i in page_indexes if (i, dpi) not in self._ocr_tokens]
+        if not missing:
+            return
+        if workers > 1 and len(missing) > 1:
+            with track("ocr"):  # rendering happens inside the pool workers too
+                pooled = ocr_pages(self.pdf_bytes, missing, dpi=dpi, workers=workers)
+            for page_index, tokens in pooled.items():
+                self._ocr_tokens[(page_index, dpi)] = tokens
+            return
+        # Sequential: stream pages through the renderer, one small window in memory at a time.
+        # With OCR_BATCHING, up to OCR_BATCH_MAX_PAGES rendered pages wait in the batcher
+        # so they are recognized together while the next pages render.
+        window = OCR_BATCH_MAX_PAGES if OCR_BATCHING else 1
+        outstanding = deque()
+        for page_index, img in iter_page_images(self.pdf_bytes, missing, dpi=dpi):
+            outstanding.append((page_index, submit_ocr(img)))
+            del img
+            if len(outstanding) >= window:
+                self._collect_ocr(outstanding.popleft(), dpi)
+        while outstanding:
+            self._collect_ocr(outstanding.popleft(), dpi)
+
+    def _collect_ocr(self, pending, dpi):
+        page_index, future = pending
+        with track("ocr"):
+            self._ocr_tokens[(page_index, dpi)] = result_tokens(future.result())
+
+    def page_stats(self):
+        """Page counts for metrics; never reads or OCRs anything that has not been already."""
+        ocr_pages = {i for i, _ in self._ocr_tokens} | {i for i, _ in self._roi_tokens}
+        if self._page_texts is None:
+            return {"pages": self._raster_page_count, "text_layer_pages": 0, "ocr_pages": len(ocr_pages)}
+        return {
+            "pages": len(self._page_texts),
+            "text_layer_pages": sum(1 for t in self._page_texts if t and len(t.strip()) >= TEXT_LAYER_MIN_CHARS),
+            "ocr_pages": len(ocr_pages),
+        }
+
+    def raster_page_count(self):
+        """Page count from the PDF info, without rendering anything."""
+        if self._raster_page_count is None:
+            self._raster_page_count = pdfinfo_from_bytes(self.pdf_bytes)["Pages"]
+        return self._raster_page_count
+
+
+def load_document(source, file_name=None):
+    """
+    Accepts a ParsedDocument, raw PDF bytes, a PDF path or a legacy base64 .txt export.
+    """
+    if isinstance(source, ParsedDocument):
+        return source
+    if isinstance(source, (bytes, bytearray, memoryview)):
+        return ParsedDocument(bytes(source), file_name=file_name)
+    path = os.fspath(source)
+    if path.endswith(".txt"):
+        with open(path, "r") as f:
+            return ParsedDocument(base64.b64decode(f.read()), file_name=file_name or os.path.basename(path))
+    document = ParsedDocument.from_path(path)
+    if file_name:
+        document.file_name = file_name
+    return document
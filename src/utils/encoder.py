@@ -1,34 +1,88 @@
 import base64
+import json
 import os
+from concurrent.futures import ProcessPoolExecutor
 
-def encode_all_raw_to_base64():
+try:
+    from .fileio import sha256_file, atomic_write_text, atomic_write_json
+except ImportError:
+    from fileio import sha256_file, atomic_write_text, atomic_write_json
+
+MANIFEST_NAME = "manifest.json"
+
+
+def load_manifest(output_dir):
+    manifest_path = os.path.join(output_dir, MANIFEST_NAME)
+    if not os.path.exists(manifest_path):
+        return {}
+    try:
+        with open(manifest_path, "r") as f:
+            return json.load(f)
+    except (OSError, ValueError) as e:
+        print(f"Manifest unreadable, re-encoding everything: {e}")
+        return {}
+
+
+def _encode_one(input_path, output_path):
+    """Worker: encodes one PDF and commits the .txt atomically."""
+    with open(input_path, "rb") as pdf_file:
+        encoded_string = base64.b64encode(pdf_file.read()).decode('utf-8')
+    atomic_write_text(output_path, encoded_string)
+
+
+def encode_all_raw_to_base64(max_workers=None):
     """
-    Scans the shared raw_files folder and encodes everything into the data directory.
+    Scans the shared raw_files folder and encodes new or changed PDFs into the data directory.
+    A manifest of size, mtime and SHA-256 per file lets unchanged PDFs be skipped.
     """
     input_folder = "raw_files"
     output_dir = "data/02_base64_encoded"
-    
+
     # Ensure folders exist
     os.makedirs(input_folder, exist_ok=True)
     os.makedirs(output_dir, exist_ok=True)
-    
+
+    manifest = load_manifest(output_dir)
     files = [f for f in os.listdir(input_folder) if f.endswith('.pdf')]
-    print(f"--- Found {len(files)} new PDFs to encode ---")
+    pending = {}
+    new_manifest = {}
 
     for file_name in files:
         input_path = os.path.join(input_folder, file_name)
         output_path = os.path.join(output_dir, file_name.replace('.pdf', '.txt'))
-        
-        try:
-            with open(input_path, "rb") as pdf_file:
-                encoded_string = base64.b64encode(pdf_file.read()).decode('utf-8')
-                
-            with open(output_path, "w") as text_file:
-                text_file.write(encoded_string)
-            
-            print(f"Successfully encoded: {file_name}")
-        except Exception as e:
-            print(f"Error encoding {file_name}: {e}")
+        stat = os.stat(input_path)
+        entry = {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns}
+        previous = manifest.get(file_name)
+        output_present = os.path.exists(output_path)
+
+        # Fast path: size and mtime unchanged, no need to hash
+        if (previous and output_present and previous.get("size") == entry["size"]
+                and previous.get("mtime_ns") == entry["mtime_ns"]):
+            new_manifest[file_name] = previous
+            continue
+
+        entry["sha256"] = sha256_file(input_path)
+        new_manifest[file_name] = entry
+        # Touched but identical content
+        if previous and output_present and previous.get("sha256") == entry["sha256"]:
+            continue
+        pending[file_name] = (input_path, output_path)
+
+    print(f"--- Found {len(pending)} new PDFs to encode ({len(files) - len(pending)} unchanged) ---")
+
+    if pending:
+        with ProcessPoolExecutor(max_workers=max_workers) as executor:
+            futures = {name: executor.submit(_encode_one, *paths) for name, paths in pending.items()}
+            for file_name, future in futures.items():
+                try:
+                    future.result()
+                    print(f"Successfully encoded: {file_name}")
+                except Exception as e:
+                    # Leave it out of the manifest so the next run retries it
+                    new_manifest.pop(file_name, None)
+                    print(f"Error encoding {file_name}: {e}")
+
+    atomic_write_json(os.path.join(output_dir, MANIFEST_NAME), new_manifest)
 
 if __name__ == "__main__":
-    encode_all_raw_to_base64()
\ No newline at end of file
+    encode_all_raw_to_base64()
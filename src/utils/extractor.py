@@ -5,149 +5,112 @@ imghdr.what = lambda *args, **kwargs: "jpeg"
 sys.modules["imghdr"] = imghdr
 # -----------------------------------
 
-import os, re, json, io
-import numpy as np
-import pdfplumber
-from paddleocr import PaddleOCR
-from pdf2image import convert_from_bytes
-
-ocr = PaddleOCR(use_angle_cls=True, lang='en', use_gpu=False, show_log=False)
-
-# ---------------- HELPERS ---------------- #
-
-def clean_reason_text(text):
-    if not text:
-        return None
-    text = re.sub(r'\s+', ' ', text).strip()
-    return text if len(text) > 2 else None
-
-def group_by_y(tokens, threshold=100):
-    tokens.sort(key=lambda x: x[1])
-    rows, current_row, current_y = [], [], None
-
-    for x, y, text in tokens:
-        if current_y is None or abs(y - current_y) < threshold:
-            current_row.append((x, y, text))
-            current_y = y
-        else:
-            rows.append(current_row)
-            current_row = [(x, y, text)]
-            current_y = y
-
-    if current_row:
-        rows.append(current_row)
-    return rows
+import os
+
+# Parsed once per file; OCR runs through the shared engine on first scanned page
+try:
+    from .document import ParsedDocument
+    from .roi_ocr import OCR_ROI_MODE
+    from .token_table import TokenTable, extract_rows
+    from .patterns import MetadataScanner, scan_text, clean_reason_text
+except ImportError:
+    from document import ParsedDocument
+    from roi_ocr import OCR_ROI_MODE
+    from token_table import TokenTable, extract_rows
+    from patterns import MetadataScanner, scan_text, clean_reason_text
 
 # ---------------- E-PDF PARSER ---------------- #
 
 def extract_using_columns(full_text):
-    lines = [l.strip() for l in full_text.split('\n') if l.strip()]
-    # Updated pattern to be case-insensitive and handle 8-char IDs
-    id_pattern = r'[A-Z0-9]{8}' 
-    extracted = []
-
-    for line in lines:
-        # Search for the ID anywhere in the line to be safe
-        match = re.search(id_pattern, line)
-        if match:
-            # Flexible splitting: handles 1 or more spaces/tabs
-            parts = re.split(r'\s{1,}', line) 
-            
-            # Locate the index where the ID starts
-            id_idx = -1
-            for i, p in enumerate(parts):
-                if re.fullmatch(id_pattern, p):
-                    id_idx = i
-                    break
-            
-            # If we found an ID and there are at least 3 numbers following it
-            if id_idx != -1 and len(parts) >= id_idx + 4:
-                extracted.append({
-                    "Agreement Number": parts[id_idx],
-                    "Penal Charge": parts[id_idx + 1],
-                    "Bounce Charge": parts[id_idx + 2],
-                    "Total Amount to be Waived off": parts[id_idx + 3],
-                    # Join remaining parts as the Reason
-                    "Reason": clean_reason_text(" ".join(parts[id_idx + 4:])) or "Not Specified"
-                })
-    return extracted
+    """Agreement rows from text-layer lines (compiled patterns from the shared registry)."""
+    return scan_text(full_text, "dms", parse_rows=True)["rows"]
 
 # ---------------- OCR PARSER ---------------- #
 
-def extract_using_ocr_layout(raw_pdf_bytes):
-    pages = convert_from_bytes(raw_pdf_bytes, dpi=300)
-    id_pattern = r'\b[A-Z0-9]{8}\b'
+def _parse_ocr_page(page_tokens):
+    """Groups one page's OCR lines into table rows. Returns (rows, page_texts)."""
+    rows = extract_rows(TokenTable.from_ocr(page_tokens))
+    for row in rows:
+        row["Reason"] = clean_reason_text(row["Reason"]) or "Not Specified"
+    return rows, [text.strip() for _, text, _ in page_tokens]
+
+
+def _page_token_source(document, page_indexes, roi):
+    if roi:
+        return document.roi_ocr_tokens
+    document.prefetch_ocr(page_indexes)  # page-parallel when OCR_PAGE_WORKERS > 1
+    return document.ocr_tokens
+
+
+def extract_using_ocr_layout(document, roi=None, page_indexes=None):
+    """
+    roi: OCR only the table/header bands found by a low-DPI pass (defaults to OCR_ROI_MODE).
+    page_indexes: 0-based pages to OCR (defaults to every page).
+    """
+    if not isinstance(document, ParsedDocument):
+        document = ParsedDocument(document)
+    roi = OCR_ROI_MODE if roi is None else roi
+    if page_indexes is None:
+        page_indexes = range(document.raster_page_count())
+    page_tokens = _page_token_source(document, page_indexes, roi)
     extracted, full_page_text = [], []
 
-    for page in pages:
-        img = np.array(page)
-        result = ocr.ocr(img, cls=True)
-        tokens = []
-
-        if result and result[0]:
-            for box, (text, conf) in result[0]:
-                x = (box[0][0] + box[2][0]) / 2
-                y = (box[0][1] + box[2][1]) / 2
-                text = text.strip()
-                tokens.append((x, y, text))
-                full_page_text.append(text)
-
-        rows = group_by_y(tokens)
-
-        for row in rows:
-            row.sort(key=lambda x: x[0])
-            texts = [t[2] for t in row]
-
-            id_match = next((t for t in texts if re.fullmatch(id_pattern, t)), None)
-            if not id_match:
-                continue
-
-            numbers = [t for t in texts if re.fullmatch(r'\d+(?:,\d{3})*(?:\.\d+)?', t)]
-            reason_parts = []
-            for t in texts:
-                if t not in numbers and t != id_match:
-                    reason_parts.append(t)
-            reason = clean_reason_text(" ".join(reason_parts))
-
-            if len(numbers) >= 3:
-                extracted.append({
-                    "Agreement Number": id_match,
-                    "Penal Charge": numbers[0],
-                    "Bounce Charge": numbers[1],
-                    "Total Amount to be Waived off": numbers[2],
-                    "Reason": clean_reason_text(" ".join(reason_parts)) or "Not Specified"
-                })
+    for page_index in page_indexes:
+        rows, texts = _parse_ocr_page(page_tokens(page_index))
+        extracted.extend(rows)
+        full_page_text.extend(texts)
 
     return extracted, " ".join(full_page_text)
 
 # ---------------- MAIN PIPELINE ---------------- #
 
-def dms_extraction_logic(pdf_filename):
-    base_path = "data/dms"
+def dms_extraction_logic(pdf_filename, document=None):
     raw_file_path = os.path.join("raw_files", pdf_filename) # Updated to point to common raw_files
-    final_json_path = os.path.join(base_path, "03_decoded_output", pdf_filename.replace(".pdf", ".json"))
     
-    with open(raw_file_path, "rb") as f:
-        raw_pdf_bytes = f.read()
-
-    # -------- Detect PDF type --------
-    full_text = ""
-    text_found = False
-
-    with pdfplumber.open(io.BytesIO(raw_pdf_bytes)) as pdf:
-        for page in pdf.pages:
-            page_text = page.extract_text()
-            if page_text and page_text.strip():
-                text_found = True
-                full_text += page_text + "\n"
-
-    if text_found:
+    # Reuse the document parsed by the router when the graph provides one
+    if document is None:
+        document = ParsedDocument.from_path(raw_file_path)
+
+    # -------- Detect PDF type, page by page --------
+    # One scanner pass over the pages collects rows (text layer) and metadata together
+    scanner = MetadataScanner("dms")
+    ocr_pages = document.ocr_page_indexes
+    rows = []
+    if not ocr_pages:
         extraction_mode = "pdfplumber"
-        rows = extract_using_columns(full_text)
-        meta_text = full_text
-    else:
+        for page_text in document.page_texts:
+            if page_text.strip():
+                scanner.feed(page_text, parse_rows=True)
+        rows = scanner.rows
+        page_methods = ["pdfplumber"] * document.page_count
+    elif len(ocr_pages) == document.page_count:
         extraction_mode = "OCR Layout"
-        rows, meta_text = extract_using_ocr_layout(raw_pdf_bytes)
+        page_indexes = range(document.raster_page_count())
+        page_tokens = _page_token_source(document, page_indexes, OCR_ROI_MODE)
+        for page_index in page_indexes:
+            page_rows, texts = _parse_ocr_page(page_tokens(page_index))
+            rows.extend(page_rows)
+            if texts:
+                # OCR words of all pages form one space-separated text
+                scanner.feed(" ".join(texts), terminator=" ")
+        page_methods = ["OCR Layout"] * document.page_count
+    else:
+        # Mixed PDF: read digital pages directly, OCR only the image-only ones, keep page order
+        extraction_mode = "Mixed"
+        page_methods = []
+        page_tokens = _page_token_source(document, ocr_pages, OCR_ROI_MODE)
+        for page_index in range(document.page_count):
+            if page_index not in ocr_pages:
+                scanner.feed(document.page_texts[page_index], parse_rows=True)
+                rows.extend(scanner.rows)
+                scanner.rows.clear()
+                page_methods.append("pdfplumber")
+            else:
+                page_rows, texts = _parse_ocr_page(page_tokens(page_index))
+                rows.extend(page_rows)
+                scanner.feed(" ".join(texts))
+                page_methods.append("OCR Layout")
+    scanned = scanner.result()
 
     # -------- Remove duplicate agreements --------
     unique_rows = {}
@@ -156,27 +119,21 @@ def dms_extraction_logic(pdf_filename):
         unique_rows[key] = r
     rows = list(unique_rows.values())
 
-    # -------- Metadata Extraction --------
-    from_match = re.search(r'From\s+.*?([\w\.-]+@[\w\.-]+\.\w+)', meta_text, re.IGNORECASE) 
-    approver = from_match.group(1) if from_match else None   
-    date_match = re.search(r'Date\s+.*?(\d{4}-\d{2}-\d{2}\s+\d{1,2}:\d{2})', meta_text, re.IGNORECASE)
-
     # Static categorization for DMS logic
     result = {
         "category": "DMS",
         "origin": "Customer Eye",
         "metadata": {
-            "approver": approver,
-            "approval_date": date_match.group(1) if date_match else None,
-            "status": "Approved" if re.search(r'approved', meta_text, re.I) else "Pending"
+            "approver": scanned["sender"],
+            "approval_date": scanned["date"],
+            "status": "Approved" if scanned["approved"] else "Pending"
         },
         "waiver_details": rows,
-        "extraction_method": extraction_mode
+        "extraction_method": extraction_mode,
+        "page_methods": page_methods
     }
+    if document.roi_stats["pages"]:
+        result["ocr_roi"] = dict(document.roi_stats)
 
-    # Save to DMS folder
-    os.makedirs(os.path.dirname(final_json_path), exist_ok=True)
-    with open(final_json_path, "w") as f:
-        json.dump(result, f, indent=4)
-
+    # Written once, with the rest of the run's results, by the output writer
     return result
\ No newline at end of file
@@ -0,0 +1,464 @@
+"""
+Per-document and per-node metrics for the graph pipeline.
+
+instrument_node wraps a graph node and records wall time, the CPU time of the thread
+running it, RSS (at the end and the peak sampled while it ran), the pages read from the
+text layer vs OCR'd, and how long the node spent in each component (text_layer,
+rasterize, ocr, soa) as reported by track(). document_span wraps a whole document
+(cache hits included) and sums its nodes. Records go to every registered sink:
+
+    PIPELINE_METRICS_JSONL     JSON lines, one per node and per document (off unless set)
+    PIPELINE_METRICS_PROM_DIR  Prometheus textfile-collector folder (one .prom file per
+                               process, pid-labelled and removed when the process exits)
+    PIPELINE_PROFILE_SLOW_SECONDS  > 0 profiles every node and keeps a cProfile dump of
+                                   the ones slower than this in PIPELINE_PROFILE_DIR
+"""
+import abc
+import cProfile
+import functools
+import json
+import multiprocessing.util
+import os
+import re
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+try:
+    from .fileio import atomic_write_text
+except ImportError:
+    from fileio import atomic_write_text
+
+PIPELINE_METRICS_JSONL = os.getenv("PIPELINE_METRICS_JSONL", "")  # e.g. data/metrics/pipeline.jsonl
+PIPELINE_METRICS_PROM_DIR = os.getenv("PIPELINE_METRICS_PROM_DIR", "")
+PIPELINE_PROFILE_SLOW_SECONDS = float(os.getenv("PIPELINE_PROFILE_SLOW_SECONDS", "0"))
+PIPELINE_PROFILE_DIR = os.getenv("PIPELINE_PROFILE_DIR", os.path.join("data", "metrics", "profiles"))
+# Resident memory is sampled this often while any span is open, for per-span peaks
+PIPELINE_RSS_SAMPLE_MS = float(os.getenv("PIPELINE_RSS_SAMPLE_MS", "20"))
+
+COMPONENTS = ("text_layer", "rasterize", "ocr", "soa")
+
+# Open spans of the running document and node; copied into threads started with
+# asyncio.to_thread / contextvars, so component time lands on the right document
+_document_span = ContextVar("document_span", default=None)
+_node_span = ContextVar("node_span", default=None)
+
+
+def _rss_mb():
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return round(int(line.split()[1]) / 1024, 1)
+    except OSError:
+        pass
+    return None
+
+
+class _RssSampler:
+    """
+    One background thread samples RSS while any span is open and raises the peak of
+    every open span, so a node or document reports the highest RSS seen while it ran
+    rather than the process lifetime peak. Concurrent spans overlap, so each one's peak
+    includes the memory of the work running alongside it.
+    """
+
+    def __init__(self, interval_ms):
+        self.interval = interval_ms / 1000
+        self._spans = set()
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._thread = None
+
+    def register(self, span):
+        with self._lock:
+            self._spans.add(span)
+            # Also restarts the thread in a forked child, where it does not survive
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._loop, name="rss-sampler", daemon=True)
+                self._thread.start()
+        self._wake.set()
+
+    def unregister(self, span):
+        with self._lock:
+            self._spans.discard(span)
+
+    def _loop(self):
+        while True:
+            with self._lock:
+                spans = list(self._spans)
+            if not spans:
+                self._wake.wait()
+                self._wake.clear()
+                continue
+            rss = _rss_mb()
+            for span in spans:
+                span.observe_rss(rss)
+            time.sleep(self.interval)
+
+
+_rss_sampler = _RssSampler(PIPELINE_RSS_SAMPLE_MS)
+
+
+# ---------------- COMPONENT TIMERS ---------------- #
+
+@contextmanager
+def track(component):
+    """Attributes the enclosed time to a component of the current node and document."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - start
+        for span in (_node_span.get(), _document_span.get()):
+            if span is not None:
+                span.add_time(component, elapsed)
+
+
+class _Span:
+    def __init__(self):
+        self.components = dict.fromkeys(COMPONENTS, 0.0)
+        self._lock = threading.Lock()
+        self._wall_start = time.perf_counter()
+        self._cpu_start = time.thread_time()
+        self._peak_rss = _rss_mb()
+        if self._peak_rss is not None:  # no /proc: nothing to sample
+            _rss_sampler.register(self)
+
+    def add_time(self, component, seconds):
+        with self._lock:
+            self.components[component] = self.components.get(component, 0.0) + seconds
+
+    def observe_rss(self, rss):
+        if rss is not None and (self._peak_rss is None or rss > self._peak_rss):
+            self._peak_rss = rss
+
+    def _cpu_seconds(self):
+        # CPU time of this thread only, so documents running in other threads are not counted
+        return time.thread_time() - self._cpu_start
+
+    def _timing(self):
+        rss = _rss_mb()
+        self.observe_rss(rss)
+        _rss_sampler.unregister(self)
+        return {
+            "wall_s": round(time.perf_counter() - self._wall_start, 4),
+            "cpu_s": round(self._cpu_seconds(), 4),
+            "rss_mb": rss,
+            "peak_rss_mb": self._peak_rss,
+            "components_s": {k: round(v, 4) for k, v in self.components.items()},
+        }
+
+
+def _page_stats(document):
+    if document is None or not hasattr(document, "page_stats"):
+        return {}
+    return document.page_stats()
+
+
+# ---------------- NODES ---------------- #
+
+def instrument_node(stage):
+    """Decorator for a graph node taking and returning state dicts."""
+    def decorator(node):
+        @functools.wraps(node)
+        def wrapper(state, *args, **kwargs):
+            span = _Span()
+            token = _node_span.set(span)
+            profiler = _start_profiler()
+            update, error = None, None
+            try:
+                update = node(state, *args, **kwargs)
+                return update
+            except Exception as e:
+                error = f"{type(e).__name__}: {e}"
+                raise
+            finally:
+                _node_span.reset(token)
+                document = (update or {}).get("document") or state.get("document")
+                record = {"type": "node", "stage": stage, "file_name": state.get("current_file"),
+                          **span._timing(), **_page_stats(document)}
+                if update and update.get("category"):
+                    record["category"] = update["category"]
+                if error:
+                    record["error"] = error
+                _finish_profiler(profiler, record)
+                parent = _document_span.get()
+                if parent is not None:
+                    parent.nodes.append(record)
+                emit(record)
+        return wrapper
+    return decorator
+
+
+# ---------------- DOCUMENTS ---------------- #
+
+class DocumentSpan(_Span):
+    def __init__(self, file_name):
+        super().__init__()
+        self.file_name = file_name
+        self.document = None  # ParsedDocument, once the caller has one
+        self.nodes = []
+        self.fields = {}
+
+    def mark(self, **fields):
+        """Extra per-document fields such as cache_hit, category or content_hash."""
+        self.fields.update(fields)
+
+    def _cpu_seconds(self):
+        # A document hops between threads under the async runner; its CPU time is its nodes'
+        return sum(node["cpu_s"] for node in self.nodes)
+
+
+@contextmanager
+def document_span(file_name):
+    """Wraps one document end to end; emits a summary record when it finishes."""
+    span = DocumentSpan(file_name)
+    token = _document_span.set(span)
+    try:
+        yield span
+    except Exception as e:
+        span.mark(error=f"{type(e).__name__}: {e}")
+        raise
+    finally:
+        _document_span.reset(token)
+        record = {"type": "document", "file_name": file_name, **span._timing(), **_page_stats(span.document),
+                  "stages_s": {n["stage"]: n["wall_s"] for n in span.nodes}, **span.fields}
+        record.setdefault("cache_hit", False)
+        emit(record)
+
+
+# ---------------- PROFILING ---------------- #
+
+# cProfile can only run one profiler per process at a time
+_profile_lock = threading.Lock()
+
+
+def _start_profiler():
+    if PIPELINE_PROFILE_SLOW_SECONDS <= 0 or not _profile_lock.acquire(blocking=False):
+        return None
+    profiler = cProfile.Profile()
+    try:
+        profiler.enable()
+    except ValueError:  # another profiler is active in this process
+        _profile_lock.release()
+        return None
+    return profiler
+
+
+def _finish_profiler(profiler, record):
+    if profiler is None:
+        return
+    try:
+        profiler.disable()
+        if record["wall_s"] >= PIPELINE_PROFILE_SLOW_SECONDS:
+            os.makedirs(PIPELINE_PROFILE_DIR, exist_ok=True)
+            name = f"{record['file_name'] or 'unknown'}.{record['stage']}.{int(time.time())}.prof"
+            path = os.path.join(PIPELINE_PROFILE_DIR, name)
+            profiler.dump_stats(path)
+            record["profile"] = path
+    finally:
+        _profile_lock.release()
+
+
+# ---------------- SINKS ---------------- #
+
+class MetricsSink(abc.ABC):
+    @abc.abstractmethod
+    def emit(self, record):
+        """Receives one node or document record."""
+
+    def close(self):
+        pass
+
+
+class JsonlSink(MetricsSink):
+    """Appends one JSON line per record; single appends stay whole across worker processes."""
+
+    def __init__(self, path):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self.path = path
+        self._lock = threading.Lock()
+        self._file = open(path, "a", encoding="utf-8")
+
+    def emit(self, record):
+        line = json.dumps({"ts": round(time.time(), 3), "pid": os.getpid(), **record}, default=str) + "\n"
+        with self._lock:
+            self._file.write(line)
+            self._file.flush()
+
+    def close(self):
+        self._file.close()
+
+
+class PrometheusTextfileSink(MetricsSink):
+    """
+    Cumulative counters for the node_exporter textfile collector, rewritten atomically
+    after every document. Each process owns its own file and labels every series with
+    its pid, so workers never clobber each other or collide on identical series; the
+    file is removed when the process exits, and files of dead processes on startup.
+    """
+
+    DOCUMENT_BUCKETS = (0.5, 1, 2, 5, 10, 30, 60, 120, 300)
+
+    def __init__(self, folder):
+        self.folder = folder
+        self._lock = threading.Lock()
+        self._reset()
+        _remove_dead_prom_files(folder)
+
+    def _reset(self):
+        self.pid = os.getpid()
+        self.path = os.path.join(self.folder, f"waiver_pipeline_{self.pid}.prom")
+        self.stage_seconds, self.stage_cpu, self.stage_calls, self.stage_errors = {}, {}, {}, {}
+        self.component_seconds = dict.fromkeys(COMPONENTS, 0.0)
+        self.documents = {}  # (category, cache_hit) -> count
+        self.pages = {"text_layer": 0, "ocr": 0}
+        self.document_buckets = [0] * len(self.DOCUMENT_BUCKETS)
+        self.document_count, self.document_sum = 0, 0.0
+        self.peak_rss_mb = 0.0
+
+    def emit(self, record):
+        with self._lock:
+            self.peak_rss_mb = max(self.peak_rss_mb, record.get("peak_rss_mb") or 0.0)
+            if record["type"] == "node":
+                stage = record["stage"]
+                self.stage_seconds[stage] = self.stage_seconds.get(stage, 0.0) + record["wall_s"]
+                self.stage_cpu[stage] = self.stage_cpu.get(stage, 0.0) + record["cpu_s"]
+                self.stage_calls[stage] = self.stage_calls.get(stage, 0) + 1
+                if "error" in record:
+                    self.stage_errors[stage] = self.stage_errors.get(stage, 0) + 1
+                return
+            key = (record.get("category") or "unknown", bool(record.get("cache_hit")))
+            self.documents[key] = self.documents.get(key, 0) + 1
+            for component, seconds in record["components_s"].items():
+                self.component_seconds[component] = self.component_seconds.get(component, 0.0) + seconds
+            self.pages["text_layer"] += record.get("text_layer_pages") or 0
+            self.pages["ocr"] += record.get("ocr_pages") or 0
+            self.document_count += 1
+            self.document_sum += record["wall_s"]
+            for i, bound in enumerate(self.DOCUMENT_BUCKETS):
+                if record["wall_s"] <= bound:
+                    self.document_buckets[i] += 1
+            atomic_write_text(self.path, self._render())
+
+    def close(self):
+        with self._lock:
+            if os.getpid() == self.pid and os.path.exists(self.path):
+                os.remove(self.path)
+
+    def _render(self):
+        lines = []
+        pid = {"pid": self.pid}
+
+        def labelled(name, labels, value):
+            label_text = ",".join(f'{k}="{v}"' for k, v in {**labels, **pid}.items())
+            lines.append(f"{name}{{{label_text}}} {value}")
+
+        def metric(name, kind, help_text, samples):
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {kind}")
+            for labels, value in samples:
+                labelled(name, labels, value)
+
+        metric("waiver_pipeline_stage_seconds_total", "counter", "Wall time spent in each graph node.",
+               [({"stage": s}, round(v, 4)) for s, v in self.stage_seconds.items()])
+        metric("waiver_pipeline_stage_cpu_seconds_total", "counter", "CPU time of the thread running each graph node.",
+               [({"stage": s}, round(v, 4)) for s, v in self.stage_cpu.items()])
+        metric("waiver_pipeline_stage_calls_total", "counter", "Graph node executions.",
+               [({"stage": s}, v) for s, v in self.stage_calls.items()])
+        metric("waiver_pipeline_stage_errors_total", "counter", "Graph node executions that raised.",
+               [({"stage": s}, v) for s, v in self.stage_errors.items()])
+        metric("waiver_pipeline_component_seconds_total", "counter",
+               "Time spent in text-layer reads, rasterization, OCR and SOA lookups.",
+               [({"component": c}, round(v, 4)) for c, v in self.component_seconds.items()])
+        metric("waiver_pipeline_documents_total", "counter", "Documents processed.",
+               [({"category": c, "cache_hit": str(hit).lower()}, v) for (c, hit), v in self.documents.items()])
+        metric("waiver_pipeline_pages_total", "counter", "Pages read from the text layer or OCR'd.",
+               [({"source": s}, v) for s, v in self.pages.items()])
+        # Every bucket a duration fits in was incremented, so the counts are cumulative
+        name = "waiver_pipeline_document_seconds"
+        lines.append(f"# HELP {name} End-to-end time per document.")
+        lines.append(f"# TYPE {name} histogram")
+        for bound, count in zip(self.DOCUMENT_BUCKETS, self.document_buckets):
+            labelled(f"{name}_bucket", {"le": bound}, count)
+        labelled(f"{name}_bucket", {"le": "+Inf"}, self.document_count)
+        labelled(f"{name}_sum", {}, round(self.document_sum, 4))
+        labelled(f"{name}_count", {}, self.document_count)
+        metric("waiver_pipeline_peak_rss_megabytes", "gauge", "Peak resident memory of this process while documents ran.",
+               [({}, self.peak_rss_mb)])
+        return "\n".join(lines) + "\n"
+
+
+def _remove_dead_prom_files(folder):
+    """Files of exited processes (recycled or killed workers) would otherwise be scraped forever."""
+    if not os.path.isdir(folder):
+        return
+    for name in os.listdir(folder):
+        match = re.fullmatch(r"waiver_pipeline_(\d+)\.prom", name)
+        if match is None:
+            continue
+        try:
+            os.kill(int(match.group(1)), 0)
+        except ProcessLookupError:
+            try:
+                os.remove(os.path.join(folder, name))
+            except FileNotFoundError:
+                pass
+        except PermissionError:  # alive, owned by someone else
+            pass
+
+
+_sinks = None
+_sinks_pid = None
+_sinks_lock = threading.RLock()
+
+
+def _configured_sinks():
+    sinks = []
+    if PIPELINE_METRICS_JSONL:
+        sinks.append(JsonlSink(PIPELINE_METRICS_JSONL))
+    if PIPELINE_METRICS_PROM_DIR:
+        sinks.append(PrometheusTextfileSink(PIPELINE_METRICS_PROM_DIR))
+    return sinks
+
+
+def get_sinks():
+    global _sinks, _sinks_pid
+    # A forked worker opens its own sinks rather than writing through the parent's
+    if _sinks is None or _sinks_pid != os.getpid():
+        with _sinks_lock:
+            if _sinks is None or _sinks_pid != os.getpid():
+                _sinks, _sinks_pid = _configured_sinks(), os.getpid()
+                # Runs at interpreter exit and when a multiprocessing worker exits (which skips atexit)
+                multiprocessing.util.Finalize(None, close_sinks, exitpriority=0)
+    return _sinks
+
+
+def close_sinks():
+    """Flushes and closes every sink (the Prometheus file of this process is removed)."""
+    global _sinks
+    with _sinks_lock:
+        sinks = _sinks if _sinks_pid == os.getpid() else []
+        _sinks = None
+    for sink in sinks:
+        try:
+            sink.close()
+        except Exception as e:
+            print(f"--- Metrics sink {type(sink).__name__} failed to close: {e} ---")
+
+
+def add_sink(sink):
+    """Registers another destination for metric records (e.g. an in-memory collector)."""
+    with _sinks_lock:
+        get_sinks().append(sink)
+
+
+def emit(record):
+    for sink in get_sinks():
+        try:
+            sink.emit(record)
+        except Exception as e:
+            # Metrics must never fail a document
+            print(f"--- Metrics sink {type(sink).__name__} failed: {e} ---")
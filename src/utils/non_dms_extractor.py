@@ -5,74 +5,76 @@ imghdr.what = lambda *args, **kwargs: "jpeg"
 sys.modules["imghdr"] = imghdr
 # -----------------------------------
 
-import base64
-import io
 import os
-import re
-import json
-import pdfplumber
-import numpy as np
-from paddleocr import PaddleOCR
-from pdf2image import convert_from_bytes
 
 # Updated import to fix ModuleNotFoundError
 try:
     from .validator import validate_non_dms_request
+    from .document import load_document
+    from .patterns import MetadataScanner
 except ImportError:
     from validator import validate_non_dms_request
+    from document import load_document
+    from patterns import MetadataScanner
 
-# Initialize PaddleOCR
-ocr = PaddleOCR(use_angle_cls=True, lang='en', use_gpu=False, show_log=False)
-
-def decode_and_extract_non_dms(base64_file_path):
-    if not os.path.exists(base64_file_path):
-        return {"error": f"File not found: {base64_file_path}"}
-
-    with open(base64_file_path, "r") as f:
-        encoded_data = f.read()
-    decoded_pdf_bytes = base64.b64decode(encoded_data)
+def decode_and_extract_non_dms(source, validate=True):
+    """
+    source: ParsedDocument from the router, raw PDF bytes, a PDF path,
+    or a legacy base64 .txt export.
+    validate: False leaves SOA validation to a later validate_batch over the whole run.
+    """
+    if isinstance(source, (str, os.PathLike)) and not os.path.exists(source):
+        return {"error": f"File not found: {source}"}
+    document = load_document(source)
     
-    full_text = ""
-    text_found = False
+    # Metadata is scanned page by page as the text comes in; no full-document string is built
+    scanner = MetadataScanner("non_dms")
+    ocr_pages = document.ocr_page_indexes
+    page_methods = []
     
-    with pdfplumber.open(io.BytesIO(decoded_pdf_bytes)) as pdf:
-        for page in pdf.pages:
-            text = page.extract_text()
-            if text and text.strip():
-                text_found = True
-                full_text += text + "\n"
-
-    if not text_found:
-        images = convert_from_bytes(decoded_pdf_bytes, dpi=300)
-        for img in images:
-            result = ocr.ocr(np.array(img), cls=True)
-            if result and result[0]:
-                page_text = " ".join([line[1][0] for line in result[0]])
-                full_text += page_text + "\n"
+    if not document.has_text_layer:
+        document.prefetch_ocr()  # page-parallel when OCR_PAGE_WORKERS > 1
+        for page_index in range(document.raster_page_count()):
+            if document.ocr_tokens(page_index):
+                scanner.feed(document.ocr_page_text(page_index))
+            page_methods.append("PaddleOCR")
         extraction_mode = "PaddleOCR"
-    else:
+    elif not ocr_pages:
+        for text in document.page_texts:
+            if text.strip():
+                scanner.feed(text)
+        page_methods = ["pdfplumber"] * document.page_count
         extraction_mode = "pdfplumber"
+    else:
+        # Mixed PDF: digital pages read directly, only image-only pages OCR'd, in page order
+        document.prefetch_ocr(ocr_pages)
+        for page_index, text in enumerate(document.page_texts):
+            if page_index in ocr_pages:
+                text = document.ocr_page_text(page_index)
+                page_methods.append("PaddleOCR")
+            else:
+                page_methods.append("pdfplumber")
+            if text.strip():
+                scanner.feed(text)
+        extraction_mode = "Mixed"
 
     # Metadata Extraction
-    email_pattern = r'[\w\.-]+@[\w\.-]+\.\w+'
-    from_match = re.search(r'From\s*[:\s]*(' + email_pattern + r')', full_text, re.I)
-    sender_email = from_match.group(1) if from_match else (re.findall(email_pattern, full_text)[0] if re.findall(email_pattern, full_text) else "Unknown")
-
-    date_match = re.search(r'Date\s*[:\s]*(.*?)(?=To|$)', full_text, re.I | re.S)
-    extracted_date = date_match.group(1).strip() if date_match else "Unknown"
-
-    lan_pattern = r'\b[A-Z][0-9][A-Z][0-9A-Z]{9,12}\b'
-    found_lans = list(set(re.findall(lan_pattern, full_text, re.I)))
+    scanned = scanner.result()
+    sender_email = scanned["sender"] or "Unknown"
+    extracted_date = scanned["date"] if scanned["date"] is not None else "Unknown"
 
     extraction_results = {
         "category": "Non-DMS",
         "metadata": {
             "from": sender_email,
             "date_time": extracted_date,
-            "fin_reference_no": found_lans
+            "fin_reference_no": scanned["lans"]
         },
-        "is_waiver_request": "waiver" in full_text.lower(),
-        "extraction_method": extraction_mode
+        "is_waiver_request": scanned["is_waiver_request"],
+        "extraction_method": extraction_mode,
+        "page_methods": page_methods
     }
 
+    if not validate:
+        return extraction_results
     return validate_non_dms_request(extraction_results)
\ No newline at end of file
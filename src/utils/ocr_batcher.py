@@ -0,0 +1,165 @@
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+import numpy as np
+
+# Pages gathered into one batch and how long the first page may wait for company
+OCR_BATCH_MAX_PAGES = int(os.getenv("OCR_BATCH_MAX_PAGES", "8"))
+OCR_BATCH_MAX_WAIT_MS = float(os.getenv("OCR_BATCH_MAX_WAIT_MS", "50"))
+# Text-line crops per recognition / angle-classifier forward pass (PaddleOCR defaults to 6)
+OCR_REC_BATCH_SIZE = int(os.getenv("OCR_REC_BATCH_SIZE", "32"))
+
+
+def _paddle_helpers():
+    """Box sorting and cropping used inside PaddleOCR's own TextSystem."""
+    try:
+        from paddleocr.tools.infer.predict_system import sorted_boxes
+        from paddleocr.tools.infer.utility import get_rotate_crop_image, get_minarea_rect_crop
+    except ImportError:
+        # paddleocr puts its folder on sys.path and imports these as `tools`
+        from tools.infer.predict_system import sorted_boxes
+        from tools.infer.utility import get_rotate_crop_image, get_minarea_rect_crop
+    return sorted_boxes, get_rotate_crop_image, get_minarea_rect_crop
+
+
+class OcrBatcher:
+    """
+    Owns the OCR engine on one scheduler thread. Pages submitted from any thread (several
+    documents in flight, or the pages of one document) are gathered for up to
+    OCR_BATCH_MAX_WAIT_MS; each page is then run through detection on its own, and the
+    text-line crops of all pages go through angle classification and recognition together,
+    in batches of OCR_REC_BATCH_SIZE. Results match engine.ocr(img, cls) page by page.
+
+    If the installed PaddleOCR does not expose the pieces needed, pages fall back to
+    per-page engine.ocr calls on the same thread; if a batch fails, its pages are retried
+    one by one so only the page at fault gets the exception.
+    """
+
+    def __init__(self, engine_getter, max_pages=OCR_BATCH_MAX_PAGES, max_wait_ms=OCR_BATCH_MAX_WAIT_MS,
+                 rec_batch_size=OCR_REC_BATCH_SIZE, record=None):
+        self._engine_getter = engine_getter
+        self._record = record  # record(pages, seconds) after every batch, for the engine's stats
+        self.max_pages = max_pages
+        self.max_wait = max_wait_ms / 1000
+        self.rec_batch_size = rec_batch_size
+        self.fallback = None  # decided on the first batch: True when the engine cannot be batched
+        self.stats = {"batches": 0, "pages": 0, "crops": 0, "largest_batch": 0, "fallback_pages": 0}
+        self._queue = queue.Queue()
+        self._thread = threading.Thread(target=self._loop, name="ocr-batcher", daemon=True)
+        self._thread.start()
+
+    def submit(self, img, cls=True):
+        """Returns a Future for the page's OCR result (same shape as engine.ocr)."""
+        future = Future()
+        self._queue.put((img, cls, future))
+        return future
+
+    # ---------------- SCHEDULER ---------------- #
+
+    def _loop(self):
+        while True:
+            batch = [self._queue.get()]
+            deadline = time.monotonic() + self.max_wait
+            while len(batch) < self.max_pages:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(self._queue.get(timeout=remaining))
+                except queue.Empty:
+                    break
+            self._run(batch)
+
+    def _run(self, batch):
+        try:
+            engine = self._engine_getter()
+        except Exception as e:
+            for _, _, future in batch:
+                future.set_exception(e)
+            return
+        if self.fallback is None:
+            self.fallback = not self._supports_batching(engine)
+        start = time.perf_counter()
+        results = None
+        if not self.fallback:
+            try:
+                results = self._run_batched(engine, batch)
+            except Exception as e:
+                # Pages of unrelated documents share the batch; only the page at fault should fail
+                print(f"--- Batched OCR failed ({type(e).__name__}: {e}); "
+                      f"retrying {len(batch)} page(s) one by one ---")
+        if results is not None:
+            for (_, _, future), result in zip(batch, results):
+                future.set_result(result)
+        else:
+            for img, cls, future in batch:
+                try:
+                    future.set_result(engine.ocr(img, cls=cls))
+                    self.stats["fallback_pages"] += 1
+                except Exception as e:
+                    future.set_exception(e)
+        if self._record is not None:
+            self._record(len(batch), time.perf_counter() - start)
+
+    @staticmethod
+    def _supports_batching(engine):
+        try:
+            _paddle_helpers()
+        except ImportError as e:
+            print(f"--- Batched OCR unavailable ({e}); using per-page OCR ---")
+            return False
+        missing = [name for name in ("args", "text_detector", "text_recognizer", "drop_score")
+                   if not hasattr(engine, name)]
+        if missing:
+            print(f"--- Batched OCR unavailable (engine has no {', '.join(missing)}); using per-page OCR ---")
+            return False
+        return True
+
+    def _run_batched(self, engine, batch):
+        sorted_boxes, get_rotate_crop_image, get_minarea_rect_crop = _paddle_helpers()
+        crop = get_rotate_crop_image if getattr(engine.args, "det_box_type", "quad") == "quad" \
+            else get_minarea_rect_crop
+        engine.text_recognizer.rec_batch_num = self.rec_batch_size
+        if getattr(engine, "text_classifier", None) is not None:
+            engine.text_classifier.cls_batch_num = self.rec_batch_size
+
+        # 1. Detection per page (page sizes differ), crops collected across the batch
+        page_boxes, crops, owners, wants_cls = [], [], [], []
+        for page, (img, cls, _) in enumerate(batch):
+            if img.ndim == 2:  # engine.ocr converts grayscale pages to 3 channels as well
+                img = np.repeat(img[:, :, None], 3, axis=2)
+            original = img.copy()
+            dt_boxes, _ = engine.text_detector(img)
+            boxes = sorted_boxes(dt_boxes) if dt_boxes is not None and len(dt_boxes) else []
+            page_boxes.append(boxes)
+            for box in boxes:
+                crops.append(crop(original, box.copy()))
+                owners.append(page)
+                wants_cls.append(cls)
+
+        # 2. Angle classification for the crops of pages that asked for it, in one call
+        use_cls = getattr(engine, "use_angle_cls", False) and getattr(engine, "text_classifier", None) is not None
+        cls_index = [i for i, wanted in enumerate(wants_cls) if wanted] if use_cls else []
+        if cls_index:
+            rotated, _, _ = engine.text_classifier([crops[i] for i in cls_index])
+            for i, rotated_crop in zip(cls_index, rotated):
+                crops[i] = rotated_crop
+
+        # 3. Recognition of every crop in the batch together
+        rec_res, _ = engine.text_recognizer(crops) if crops else ([], 0)
+
+        results = [[] for _ in batch]
+        for page, box, (text, score) in zip(owners, [b for boxes in page_boxes for b in boxes],
+                                            (r[:2] for r in rec_res)):
+            if score >= engine.drop_score:
+                results[page].append([box.tolist(), (text, score)])
+
+        self.stats["batches"] += 1
+        self.stats["pages"] += len(batch)
+        self.stats["crops"] += len(crops)
+        self.stats["largest_batch"] = max(self.stats["largest_batch"], len(batch))
+        # engine.ocr wraps each page's lines in a list and reports a page without text as [None]
+        return [[lines] if lines else [None] for lines in results]
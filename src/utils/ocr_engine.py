@@ -0,0 +1,157 @@
+# ---- Python 3.13 PaddleOCR fix ----
+import types, sys
+imghdr = types.ModuleType("imghdr")
+imghdr.what = lambda *args, **kwargs: "jpeg"
+sys.modules["imghdr"] = imghdr
+# -----------------------------------
+
+import os
+import time
+import resource
+import threading
+from concurrent.futures import Future
+
+try:
+    from .instrumentation import track
+    from .ocr_batcher import OcrBatcher
+except ImportError:
+    from instrumentation import track
+    from ocr_batcher import OcrBatcher
+
+# "1" routes every OCR call through the OcrBatcher so pages from concurrent callers share batches
+OCR_BATCHING = os.getenv("OCR_BATCHING", "0") == "1"
+
+# Same settings the router and both extractors used for their own instances
+OCR_SETTINGS = dict(use_angle_cls=True, lang='en', use_gpu=False, show_log=False)
+
+_engine = None
+_batcher = None
+_load_lock = threading.Lock()
+_call_lock = threading.Lock()
+_stats = {
+    "loaded": False,
+    "load_seconds": None,
+    "rss_before_load_mb": None,
+    "rss_after_load_mb": None,
+    "ocr_calls": 0,
+    "ocr_seconds": 0.0,
+}
+
+
+def _current_rss_mb():
+    """Resident memory of this process in MB (falls back to peak RSS off Linux)."""
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return round(int(line.split()[1]) / 1024, 1)
+    except OSError:
+        pass
+    return round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1)
+
+
+def get_ocr():
+    """
+    Returns the process-wide PaddleOCR engine.
+    The model is only loaded the first time a scanned page actually needs it.
+    """
+    global _engine
+    if _engine is None:
+        with _load_lock:
+            if _engine is None:
+                from paddleocr import PaddleOCR
+
+                _stats["rss_before_load_mb"] = _current_rss_mb()
+                start = time.perf_counter()
+                _engine = PaddleOCR(**OCR_SETTINGS)
+                _stats["load_seconds"] = round(time.perf_counter() - start, 3)
+                _stats["rss_after_load_mb"] = _current_rss_mb()
+                _stats["loaded"] = True
+                print(f"--- OCR engine loaded in {_stats['load_seconds']}s (pid {os.getpid()}) ---")
+    return _engine
+
+
+def get_batcher():
+    """The process-wide OCR batch scheduler (started on first use)."""
+    global _batcher
+    if _batcher is None:
+        with _load_lock:
+            if _batcher is None:
+                _batcher = OcrBatcher(get_ocr, record=_record_batch)
+    return _batcher
+
+
+def _record_batch(pages, seconds):
+    _stats["ocr_calls"] += pages
+    _stats["ocr_seconds"] += seconds
+
+
+def _ocr_now(img, cls):
+    engine = get_ocr()
+    with _call_lock:
+        start = time.perf_counter()
+        result = engine.ocr(img, cls=cls)
+        _stats["ocr_calls"] += 1
+        _stats["ocr_seconds"] += time.perf_counter() - start
+    return result
+
+
+def submit_ocr(img, cls=True):
+    """
+    Future for one page's OCR result. With OCR_BATCHING the page is queued for the
+    batcher, so callers can keep rendering while earlier pages are recognized;
+    otherwise the page is OCR'd right away.
+    """
+    if OCR_BATCHING:
+        return get_batcher().submit(img, cls)
+    future = Future()
+    with track("ocr"):
+        future.set_result(_ocr_now(img, cls))
+    return future
+
+
+def run_ocr(img, cls=True):
+    """
+    Runs OCR on one page image with the shared engine.
+    Calls are serialized because a single Paddle predictor is not thread-safe.
+    """
+    if OCR_BATCHING:
+        with track("ocr"):
+            return get_batcher().submit(img, cls).result()
+    with track("ocr"):
+        return _ocr_now(img, cls)
+
+
+def result_tokens(result):
+    """engine.ocr output of one page as (box, text, confidence) with plain floats."""
+    if not (result and result[0]):
+        return []
+    return [([[float(x), float(y)] for x, y in box], text, float(conf))
+            for box, (text, conf) in result[0]]
+
+
+def ocr_image_tokens(img, cls=True):
+    """OCR lines of one image as (box, text, confidence) with plain floats, cheap to cache or pickle."""
+    return result_tokens(run_ocr(img, cls=cls))
+
+
+def is_loaded():
+    return _engine is not None
+
+
+def warm_up():
+    """Loads the model ahead of the first document (e.g. in a worker initializer)."""
+    get_ocr()
+    return ocr_stats()
+
+
+def ocr_stats():
+    """Load time, call counts and memory figures for the shared engine."""
+    stats = dict(_stats)
+    stats["ocr_seconds"] = round(stats["ocr_seconds"], 3)
+    if _batcher is not None:
+        stats["batching"] = dict(_batcher.stats)
+    stats["rss_mb"] = _current_rss_mb()
+    if stats["rss_before_load_mb"] is not None:
+        stats["model_rss_mb"] = round(stats["rss_after_load_mb"] - stats["rss_before_load_mb"], 1)
+    return stats
@@ -0,0 +1,239 @@
+"""
+The one place pipeline results are written. Each finished document goes to every
+format listed in OUTPUT_FORMATS (comma separated):
+
+    json     one file per document in OUTPUT_DIR, committed atomically (the default)
+    jsonl    one line per document appended to OUTPUT_JSONL_PATH
+    parquet  waiver_details and validation_results rows, one table per kind under
+             OUTPUT_PARQUET_DIR, flushed as part files every OUTPUT_PARQUET_ROWS rows
+             or OUTPUT_PARQUET_FLUSH_SECONDS (needs pyarrow)
+
+Reconciliation can read the JSONL stream or the Parquet folders (pyarrow.dataset,
+pandas.read_parquet) instead of opening one small JSON file per document.
+"""
+import json
+import os
+import threading
+import time
+import uuid
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    from .fileio import atomic_write_bytes
+except ImportError:
+    from fileio import atomic_write_bytes
+
+OUTPUT_FORMATS = os.getenv("OUTPUT_FORMATS", "json")
+OUTPUT_DIR = os.getenv("OUTPUT_DIR", "data/03_decoded_output")
+OUTPUT_JSONL_PATH = os.getenv("OUTPUT_JSONL_PATH", "data/04_exports/results.jsonl")
+OUTPUT_PARQUET_DIR = os.getenv("OUTPUT_PARQUET_DIR", "data/04_exports")
+OUTPUT_PARQUET_ROWS = int(os.getenv("OUTPUT_PARQUET_ROWS", "50000"))
+# Long-running callers (the watcher) also flush rows that have waited this long
+OUTPUT_PARQUET_FLUSH_SECONDS = float(os.getenv("OUTPUT_PARQUET_FLUSH_SECONDS", "300"))
+# "0" writes compact per-document JSON; pretty files are larger and slower to parse
+OUTPUT_JSON_PRETTY = os.getenv("OUTPUT_JSON_PRETTY", "1") == "1"
+
+FORMATS = ("json", "jsonl", "parquet")
+# Every part file of a table has exactly these columns, so the folder reads as one dataset;
+# row fields outside the list are kept as a JSON object in "extra"
+TABLE_COLUMNS = {
+    "waiver_details": ("file_name", "content_hash", "category", "Agreement Number", "Penal Charge",
+                       "Bounce Charge", "Total Amount to be Waived off", "Reason",
+                       "database_total_overdue", "validation_status", "recommendation"),
+    "validation_results": ("file_name", "content_hash", "category", "Agreement Number",
+                           "Database Total Overdue", "validation_status", "recommendation"),
+}
+TABLES = tuple(TABLE_COLUMNS)
+# Stored as float64 (the validators report 0 for unknown agreements and floats otherwise);
+# every other column is a string
+NUMERIC_COLUMNS = {"database_total_overdue", "Database Total Overdue"}
+
+
+# ---------------- SERIALIZATION ---------------- #
+
+def dumps(data, pretty=False):
+    """UTF-8 JSON bytes; orjson when installed, the json module otherwise."""
+    if orjson is not None:
+        option = orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY
+        if pretty:
+            option |= orjson.OPT_INDENT_2
+        return orjson.dumps(data, default=str, option=option)
+    if pretty:
+        return json.dumps(data, indent=2, ensure_ascii=False, default=str).encode("utf-8")
+    return json.dumps(data, separators=(",", ":"), ensure_ascii=False, default=str).encode("utf-8")
+
+
+def _text(value):
+    if value is None or isinstance(value, str):
+        return value
+    # Nested values go into the columnar export as JSON text
+    if isinstance(value, (dict, list, tuple)):
+        return dumps(value).decode("utf-8")
+    return str(value)
+
+
+def _number(value):
+    if value is None:
+        return None
+    try:
+        return float(value.replace(",", "") if isinstance(value, str) else value)
+    except (TypeError, ValueError):
+        return None
+
+
+def _schema(table):
+    import pyarrow as pa
+
+    fields = [pa.field(name, pa.float64() if name in NUMERIC_COLUMNS else pa.string())
+              for name in TABLE_COLUMNS[table]]
+    return pa.schema(fields + [pa.field("extra", pa.string())])
+
+
+def _table(table, records):
+    """pyarrow table of row dicts cast to the table's fixed schema."""
+    import pyarrow as pa
+
+    columns = TABLE_COLUMNS[table]
+    data = {name: [(_number if name in NUMERIC_COLUMNS else _text)(record.get(name)) for record in records]
+            for name in columns}
+    known = set(columns)
+    data["extra"] = [_text({k: v for k, v in record.items() if k not in known} or None) for record in records]
+    return pa.table(data, schema=_schema(table))
+
+
+# ---------------- WRITER ---------------- #
+
+class OutputWriter:
+    """
+    Writes each result once per configured format. Safe to share between threads;
+    call close() (or use it as a context manager) to flush buffered Parquet rows.
+    """
+
+    def __init__(self, formats=None, output_dir=OUTPUT_DIR, jsonl_path=OUTPUT_JSONL_PATH,
+                 parquet_dir=OUTPUT_PARQUET_DIR, parquet_rows=OUTPUT_PARQUET_ROWS,
+                 parquet_flush_seconds=OUTPUT_PARQUET_FLUSH_SECONDS, pretty=OUTPUT_JSON_PRETTY):
+        if formats is None:
+            formats = OUTPUT_FORMATS
+        if isinstance(formats, str):
+            formats = [f.strip() for f in formats.split(",") if f.strip()]
+        unknown = set(formats) - set(FORMATS)
+        if unknown:
+            raise ValueError(f"Unknown output format(s) {sorted(unknown)}; choose from {FORMATS}")
+        self.formats = list(dict.fromkeys(formats))
+        if "parquet" in self.formats:
+            try:
+                import pyarrow.parquet  # noqa: F401
+            except ImportError:
+                print("--- pyarrow not installed; skipping the Parquet export ---")
+                self.formats.remove("parquet")
+
+        self.output_dir = output_dir
+        self.jsonl_path = jsonl_path
+        self.parquet_dir = parquet_dir
+        self.parquet_rows = parquet_rows
+        self.parquet_flush_seconds = parquet_flush_seconds
+        self.pretty = pretty
+        self.stats = {"documents": 0, "json_files": 0, "jsonl_lines": 0, "parquet_files": 0, "parquet_rows": 0}
+        self._lock = threading.Lock()
+        self._jsonl_fd = None
+        self._buffers = {table: [] for table in TABLES}
+        self._buffered_since = {table: None for table in TABLES}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def write(self, result):
+        """Commits one pipeline result (as returned by process_file) to every format."""
+        with self._lock:
+            if "json" in self.formats:
+                self._write_json(result)
+            if "jsonl" in self.formats:
+                self._write_jsonl(result)
+            if "parquet" in self.formats:
+                self._buffer_rows(result)
+            self.stats["documents"] += 1
+
+    def flush_due(self):
+        """
+        Writes the Parquet rows that have waited OUTPUT_PARQUET_FLUSH_SECONDS; long-running
+        callers call this periodically so rows do not sit in memory while no documents arrive.
+        """
+        with self._lock:
+            now = time.monotonic()
+            for table in TABLES:
+                if self._buffers[table] and now - self._buffered_since[table] >= self.parquet_flush_seconds:
+                    self._flush_parquet(table)
+
+    def close(self):
+        with self._lock:
+            for table in TABLES:
+                self._flush_parquet(table)
+            if self._jsonl_fd is not None:
+                os.fsync(self._jsonl_fd)
+                os.close(self._jsonl_fd)
+                self._jsonl_fd = None
+
+    # ---------------- FORMATS ---------------- #
+
+    def _write_json(self, result):
+        path = os.path.join(self.output_dir, os.path.splitext(result["file_name"])[0] + ".json")
+        atomic_write_bytes(path, dumps(result["extracted_data"], pretty=self.pretty))
+        self.stats["json_files"] += 1
+
+    def _write_jsonl(self, result):
+        if self._jsonl_fd is None:
+            os.makedirs(os.path.dirname(self.jsonl_path) or ".", exist_ok=True)
+            # O_APPEND keeps each single-write line whole when several processes share the stream
+            self._jsonl_fd = os.open(self.jsonl_path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+        record = {
+            "file_name": result["file_name"],
+            "content_hash": result.get("content_hash"),
+            "category": result.get("category"),
+            "extracted_data": result["extracted_data"],
+        }
+        os.write(self._jsonl_fd, dumps(record) + b"\n")
+        self.stats["jsonl_lines"] += 1
+
+    def _buffer_rows(self, result):
+        data = result["extracted_data"]
+        keys = {"file_name": result["file_name"], "content_hash": result.get("content_hash"),
+                "category": result.get("category") or data.get("category")}
+        now = time.monotonic()
+        for table in TABLES:
+            buffer = self._buffers[table]
+            rows = data.get(table) or []
+            if rows and not buffer:
+                self._buffered_since[table] = now
+            buffer.extend({**keys, **row} for row in rows)
+            if buffer and (len(buffer) >= self.parquet_rows
+                           or now - self._buffered_since[table] >= self.parquet_flush_seconds):
+                self._flush_parquet(table)
+
+    def _flush_parquet(self, table):
+        records = self._buffers[table]
+        if not records:
+            return
+        import pyarrow.parquet as pq
+
+        # Part files of one table form a dataset folder; the random suffix keeps writers apart
+        name = f"part-{time.strftime('%Y%m%d-%H%M%S')}-{os.getpid()}-{uuid.uuid4().hex[:12]}.parquet"
+        path = os.path.join(self.parquet_dir, table, name)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = os.path.join(os.path.dirname(path), f".tmp-{name}")
+        try:
+            pq.write_table(_table(table, records), tmp_path, compression="zstd")
+            os.replace(tmp_path, path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+        self.stats["parquet_files"] += 1
+        self.stats["parquet_rows"] += len(records)
+        self._buffers[table] = []
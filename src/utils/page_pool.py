@@ -0,0 +1,61 @@
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+
+try:
+    from .ocr_engine import ocr_image_tokens
+    from .rasterize import render_page
+except ImportError:
+    from ocr_engine import ocr_image_tokens
+    from rasterize import render_page
+
+# Pages of one PDF OCR'd concurrently; 1 keeps the in-process sequential path
+OCR_PAGE_WORKERS = int(os.getenv("OCR_PAGE_WORKERS", "1"))
+
+_pool = None
+_pool_workers = None
+_pool_lock = threading.Lock()
+
+
+def _get_pool(workers):
+    """One long-lived pool per process so each page worker loads its OCR model only once."""
+    global _pool, _pool_workers
+    with _pool_lock:
+        if _pool is None or _pool_workers != workers:
+            if _pool is not None:
+                _pool.shutdown(wait=False)
+            # Spawned, not forked: a fork taken while another thread holds the OCR engine's
+            # locks (the async runner's threads) would leave the child deadlocked on them
+            _pool = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"))
+            _pool_workers = workers
+        return _pool
+
+
+def _ocr_page(pdf_bytes, page_index, dpi):
+    """Worker: rasterizes a single 0-based page and OCRs it."""
+    img = render_page(pdf_bytes, page_index, dpi=dpi)
+    return ocr_image_tokens(img) if img is not None else []
+
+
+def ocr_pages(pdf_bytes, page_indexes, dpi=300, workers=None):
+    """
+    OCRs the given 0-based pages across worker processes (rasterization included)
+    and returns {page_index: [(box, text, conf), ...]} in page order.
+    """
+    workers = workers or OCR_PAGE_WORKERS
+    page_indexes = sorted(page_indexes)
+    if workers <= 1 or len(page_indexes) <= 1:
+        return {i: _ocr_page(pdf_bytes, i, dpi) for i in page_indexes}
+
+    pool = _get_pool(workers)
+    futures = [pool.submit(_ocr_page, pdf_bytes, i, dpi) for i in page_indexes]
+    return {i: future.result() for i, future in zip(page_indexes, futures)}
+
+
+def shutdown():
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown()
+            _pool = None
@@ -0,0 +1,177 @@
+import re
+
+# ---------------- PATTERN REGISTRY ---------------- #
+# Compiled once at import and shared by the DMS and non-DMS extractors.
+
+EMAIL = r'[\w\.-]+@[\w\.-]+\.\w+'
+
+AGREEMENT_ID = re.compile(r'[A-Z0-9]{8}')
+WHITESPACE = re.compile(r'\s{1,}')
+SPACES = re.compile(r'\s+')
+EMAIL_ADDRESS = re.compile(EMAIL)
+APPROVED = re.compile(r'approved', re.I)
+LAN = re.compile(r'\b[A-Z][0-9][A-Z][0-9A-Z]{9,12}\b', re.I)
+
+# DMS (Customer Eye) mail headers
+DMS_FROM = re.compile(r'From\s+.*?(' + EMAIL + r')', re.I)
+DMS_DATE = re.compile(r'Date\s+.*?(\d{4}-\d{2}-\d{2}\s+\d{1,2}:\d{2})', re.I)
+
+# Non-DMS mail headers; the date runs up to the next "To" or the end of the text
+NON_DMS_FROM = re.compile(r'From\s*[:\s]*(' + EMAIL + r')', re.I)
+NON_DMS_DATE = re.compile(r'Date\s*[:\s]*(.*?)(?=To|$)', re.I | re.S)
+
+
+def clean_reason_text(text):
+    if not text:
+        return None
+    text = SPACES.sub(' ', text).strip()
+    return text if len(text) > 2 else None
+
+
+def parse_row_line(line):
+    """One text-layer line -> waiver row dict, or None if it is not an agreement row."""
+    # Search for the ID anywhere in the line to be safe
+    if not AGREEMENT_ID.search(line):
+        return None
+    # Flexible splitting: handles 1 or more spaces/tabs
+    parts = WHITESPACE.split(line)
+
+    # Locate the index where the ID starts
+    id_idx = next((i for i, p in enumerate(parts) if AGREEMENT_ID.fullmatch(p)), -1)
+
+    # If we found an ID and there are at least 3 numbers following it
+    if id_idx == -1 or len(parts) < id_idx + 4:
+        return None
+    return {
+        "Agreement Number": parts[id_idx],
+        "Penal Charge": parts[id_idx + 1],
+        "Bounce Charge": parts[id_idx + 2],
+        "Total Amount to be Waived off": parts[id_idx + 3],
+        # Join remaining parts as the Reason
+        "Reason": clean_reason_text(" ".join(parts[id_idx + 4:])) or "Not Specified"
+    }
+
+
+# ---------------- STREAMING SCANNER ---------------- #
+
+# OCR text has no line breaks, so bound how much of the previous pages is re-scanned
+MAX_TAIL_CHARS = 4096
+
+def _last_lines(text, count=2):
+    """
+    Suffix of text starting at its last `count` non-blank lines. A header match
+    ("Date" at a line end, value on the next line) can only reach the next page
+    if it starts within these lines.
+    """
+    lines = text.split("\n")
+    non_blank = [i for i, line in enumerate(lines) if line.strip()]
+    if len(non_blank) <= count:
+        return text
+    return "\n".join(lines[non_blank[-count]:])
+
+
+class MetadataScanner:
+    """
+    Pulls every metadata field (sender, date, status, LANs, waiver flag) and, optionally,
+    the agreement rows out of a document fed page by page. Each pattern stops running
+    once its field is found, and no full-document string is ever rebuilt.
+
+    Results match running the same patterns over the pages concatenated as
+    page + terminator: multi-line header matches that straddle a page break are
+    caught by re-scanning the end of the previous page together with the next one.
+    """
+
+    def __init__(self, profile):
+        if profile not in ("dms", "non_dms"):
+            raise ValueError(f"Unknown scanner profile: {profile!r}")
+        self.profile = profile
+        self.sender = None
+        self.first_email = None
+        self.date = None
+        self.approved = False
+        self.waiver = False
+        self.lans = {}  # insertion-ordered set
+        self.rows = []
+        self._date_buffer = None  # non-DMS date still waiting for its closing "To"
+        self._tail = ""
+
+    def feed(self, page_text, terminator="\n", parse_rows=False):
+        chunk = page_text + terminator
+        window = self._tail + chunk
+
+        if parse_rows:
+            for line in page_text.split("\n"):
+                line = line.strip()
+                if line:
+                    row = parse_row_line(line)
+                    if row:
+                        self.rows.append(row)
+
+        if not self.approved and APPROVED.search(chunk):
+            self.approved = True
+        if not self.waiver and "waiver" in chunk.lower():
+            self.waiver = True
+
+        if self.profile == "dms":
+            if self.sender is None:
+                match = DMS_FROM.search(window)
+                if match:
+                    self.sender = match.group(1)
+            if self.date is None:
+                match = DMS_DATE.search(window)
+                if match:
+                    self.date = match.group(1)
+        else:
+            if self.sender is None:
+                match = NON_DMS_FROM.search(window)
+                if match:
+                    self.sender = match.group(1)
+            if self.first_email is None:
+                match = EMAIL_ADDRESS.search(chunk)
+                if match:
+                    self.first_email = match.group(0)
+            self._scan_non_dms_date(chunk)
+            for lan in LAN.findall(chunk):
+                self.lans.setdefault(lan, None)
+
+        # Keep the page end around for header matches that continue on the next page
+        if self.sender is None or (self.profile == "dms" and self.date is None):
+            self._tail = _last_lines(window)[-MAX_TAIL_CHARS:]
+        else:
+            self._tail = ""
+
+    def _scan_non_dms_date(self, chunk):
+        if self.date is not None:
+            return
+        if self._date_buffer is None:
+            match = NON_DMS_DATE.search(chunk)
+            if not match:
+                return
+            self._date_buffer = chunk[match.start():]
+        else:
+            self._date_buffer += chunk
+        match = NON_DMS_DATE.match(self._date_buffer)
+        if self._date_buffer[match.end():match.end() + 2].lower() == "to":
+            self.date = match.group(1).strip()
+            self._date_buffer = None
+
+    def result(self):
+        """Final field values; a date still open at the end of the text runs to the end."""
+        if self.date is None and self._date_buffer is not None:
+            self.date = NON_DMS_DATE.match(self._date_buffer).group(1).strip()
+            self._date_buffer = None
+        return {
+            "sender": self.sender if self.sender is not None else self.first_email,
+            "date": self.date,
+            "approved": self.approved,
+            "is_waiver_request": self.waiver,
+            "lans": list(self.lans),
+            "rows": self.rows,
+        }
+
+
+def scan_text(text, profile, parse_rows=False):
+    """Single-pass scan of text that is already in memory."""
+    scanner = MetadataScanner(profile)
+    scanner.feed(text, terminator="", parse_rows=parse_rows)
+    return scanner.result()
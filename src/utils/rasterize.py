@@ -0,0 +1,64 @@
+import os
+import tempfile
+
+import numpy as np
+from pdf2image import convert_from_bytes, convert_from_path
+
+try:
+    from .instrumentation import track
+except ImportError:
+    from instrumentation import track
+
+# Pages rendered per pdftoppm call while streaming; bounds peak image memory
+RASTER_WINDOW = int(os.getenv("RASTER_WINDOW", "2"))
+
+
+def _to_array(image):
+    """Copies the page into a NumPy array and frees the PIL buffer right away."""
+    array = np.array(image)
+    image.close()
+    return array
+
+
+def render_page(pdf_bytes, page_index, dpi=300):
+    """Renders a single 0-based page to a NumPy array (None if the page does not exist)."""
+    with track("rasterize"):
+        images = convert_from_bytes(pdf_bytes, dpi=dpi, first_page=page_index + 1, last_page=page_index + 1)
+        return _to_array(images[0]) if images else None
+
+
+def iter_page_images(pdf_bytes, page_indexes, dpi=300, window=None):
+    """
+    Yields (page_index, array) one page at a time for the given 0-based pages.
+    Only `window` pages are ever rendered at once and the PDF is spooled to
+    disk a single time instead of once per pdftoppm call.
+    """
+    window = window or RASTER_WINDOW
+    page_indexes = sorted(page_indexes)
+    if not page_indexes:
+        return
+
+    with tempfile.NamedTemporaryFile(suffix=".pdf") as spool:
+        spool.write(pdf_bytes)
+        spool.flush()
+        for start, end in _windows(page_indexes, window):
+            with track("rasterize"):
+                images = convert_from_path(spool.name, dpi=dpi, first_page=start + 1, last_page=end + 1)
+            for offset in range(len(images)):
+                # Hand over ownership so each page buffer is released as soon as it is consumed
+                image, images[offset] = images[offset], None
+                with track("rasterize"):
+                    array = _to_array(image)
+                yield start + offset, array
+                del array
+
+
+def _windows(page_indexes, window):
+    """Splits sorted page indexes into contiguous (start, end) runs of at most `window` pages."""
+    start = prev = page_indexes[0]
+    for page_index in page_indexes[1:]:
+        if page_index != prev + 1 or page_index - start >= window:
+            yield start, prev
+            start = page_index
+        prev = page_index
+    yield start, prev
@@ -0,0 +1,93 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+
+try:
+    from .versions import pipeline_version
+except ImportError:
+    from versions import pipeline_version
+
+DEFAULT_CACHE_PATH = os.path.join("data", "cache", "results.sqlite")
+DEFAULT_MAX_MB = float(os.getenv("RESULT_CACHE_MAX_MB", "512"))
+
+
+class ResultCache:
+    """
+    Persistent cache of pipeline outputs keyed by PDF content hash + pipeline version.
+    Entries from other versions are purged on open; the least recently used
+    entries are evicted once the payloads exceed max_mb.
+    """
+
+    def __init__(self, path=DEFAULT_CACHE_PATH, version=None, max_mb=DEFAULT_MAX_MB):
+        self.path = path
+        self.version = version or pipeline_version()
+        self.max_bytes = int(max_mb * 1024 * 1024)
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._conn = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS results (
+                content_hash TEXT NOT NULL,
+                version TEXT NOT NULL,
+                category TEXT,
+                payload TEXT NOT NULL,
+                size INTEGER NOT NULL,
+                created REAL NOT NULL,
+                last_access REAL NOT NULL,
+                PRIMARY KEY (content_hash, version)
+            )""")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_results_access ON results(last_access)")
+        with self._conn:
+            self._conn.execute("DELETE FROM results WHERE version != ?", (self.version,))
+
+    def get(self, content_hash):
+        """Returns {"category", "extracted_data"} for a processed PDF, or None."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT category, payload FROM results WHERE content_hash = ? AND version = ?",
+                (content_hash, self.version)).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            with self._conn:
+                self._conn.execute(
+                    "UPDATE results SET last_access = ? WHERE content_hash = ? AND version = ?",
+                    (time.time(), content_hash, self.version))
+            self.hits += 1
+        return {"category": row[0], "extracted_data": json.loads(row[1])}
+
+    def put(self, content_hash, category, extracted_data):
+        payload = json.dumps(extracted_data)
+        now = time.time()
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO results VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (content_hash, self.version, category, payload, len(payload), now, now))
+            self._evict()
+
+    def _evict(self):
+        total = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM results").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        for content_hash, version, size in self._conn.execute(
+                "SELECT content_hash, version, size FROM results ORDER BY last_access").fetchall():
+            if total <= self.max_bytes:
+                break
+            self._conn.execute("DELETE FROM results WHERE content_hash = ? AND version = ?",
+                               (content_hash, version))
+            total -= size
+
+    def stats(self):
+        count, total = self._conn.execute(
+            "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM results").fetchone()
+        return {"entries": count, "bytes": total, "hits": self.hits, "misses": self.misses,
+                "version": self.version}
+
+    def close(self):
+        self._conn.close()
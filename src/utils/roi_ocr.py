@@ -0,0 +1,86 @@
+import os
+import re
+
+try:
+    from .ocr_engine import ocr_image_tokens
+    from .rasterize import render_page
+except ImportError:
+    from ocr_engine import ocr_image_tokens
+    from rasterize import render_page
+
+# Two-pass OCR: a cheap low-DPI pass finds the waiver table and header lines,
+# then only those horizontal bands are recognized at full resolution.
+OCR_ROI_MODE = os.getenv("OCR_ROI_MODE", "0") == "1"
+ROI_SCAN_DPI = int(os.getenv("ROI_SCAN_DPI", "100"))
+
+# Loose on purpose: low-DPI recognition misreads characters, we only need the location
+ROI_KEYWORDS = re.compile(r'from|date|agreement|penal|bounce|waive|approv', re.I)
+ROI_ID_LIKE = re.compile(r'\b(?=[A-Z0-9]*\d)[A-Z0-9]{7,9}\b')
+
+
+def _is_region_of_interest(text):
+    return bool(ROI_KEYWORDS.search(text) or ROI_ID_LIKE.search(text))
+
+
+def _merge_bands(bands):
+    merged = []
+    for top, bottom in sorted(bands):
+        if merged and top <= merged[-1][1]:
+            merged[-1][1] = max(merged[-1][1], bottom)
+        else:
+            merged.append([top, bottom])
+    return merged
+
+
+def find_bands(scan_tokens, scale, page_height):
+    """
+    Turns interesting low-DPI lines into full-width (top, bottom) pixel bands at OCR resolution,
+    padded by one line height so neighbouring cells of a table row are kept.
+    """
+    bands = []
+    for box, text, _ in scan_tokens:
+        if not _is_region_of_interest(text):
+            continue
+        ys = [p[1] * scale for p in box]
+        top, bottom = min(ys), max(ys)
+        pad = bottom - top
+        bands.append((max(0, int(top - pad)), min(page_height, int(bottom + pad) + 1)))
+    return _merge_bands(bands)
+
+
+def roi_ocr_page(pdf_bytes, page_index, dpi=300, scan_dpi=None):
+    """
+    Returns (tokens, stats) for one page. Tokens use full-page coordinates at `dpi`,
+    so they drop into the same row grouping as a full-page OCR.
+    """
+    scan_dpi = scan_dpi or ROI_SCAN_DPI
+    scan_img = render_page(pdf_bytes, page_index, dpi=scan_dpi)
+    if scan_img is None:
+        return [], {"pixels_total": 0, "pixels_ocr": 0, "pixels_skipped": 0, "bands": 0}
+    scan_tokens = ocr_image_tokens(scan_img)
+    del scan_img
+
+    img = render_page(pdf_bytes, page_index, dpi=dpi)
+    height, width = img.shape[:2]
+    bands = find_bands(scan_tokens, dpi / scan_dpi, height)
+
+    if not bands:
+        # Nothing recognizable at low resolution: do not risk losing rows, OCR the whole page
+        tokens = ocr_image_tokens(img)
+        pixels_ocr = height * width
+    else:
+        tokens, pixels_ocr = [], 0
+        for top, bottom in bands:
+            crop = img[top:bottom]
+            pixels_ocr += crop.shape[0] * width
+            for box, text, conf in ocr_image_tokens(crop):
+                tokens.append(([[x, y + top] for x, y in box], text, conf))
+    del img
+
+    stats = {
+        "pixels_total": height * width,
+        "pixels_ocr": pixels_ocr,
+        "pixels_skipped": height * width - pixels_ocr,
+        "bands": len(bands),
+    }
+    return tokens, stats
@@ -6,46 +6,88 @@ sys.modules["imghdr"] = imghdr
 
 
 
-import io
+import os
 import re
-import numpy as np
-import pdfplumber
-from paddleocr import PaddleOCR
-from pdf2image import convert_from_bytes
 
-# Lightweight OCR instance for routing
-router_ocr = PaddleOCR(use_angle_cls=True, lang='en', use_gpu=False, show_log=False)
+try:
+    from .document import ParsedDocument, OCR_DPI
+    from .ocr_engine import ocr_image_tokens
+except ImportError:
+    from document import ParsedDocument, OCR_DPI
+    from ocr_engine import ocr_image_tokens
 
-def categorize_document(pdf_bytes):
+# Scanned fallback: OCR only the top band of page 1 at low resolution first
+ROUTER_SCAN_DPI = int(os.getenv("ROUTER_SCAN_DPI", "100"))
+ROUTER_HEADER_BAND = float(os.getenv("ROUTER_HEADER_BAND", "0.4"))
+
+
+def _is_dms(text):
+    # DMS (Customer Eye) contains table headers
+    return "Agreement" in text and ("Penal" in text or "Bounce" in text)
+
+
+def _has_non_dms_keywords(text):
+    # Non-DMS (Non-Customer Eye) contains LAN/Waiver keywords
+    return "LAN" in text or "P2W" in text or "waiver" in text.lower()
+
+
+def _decision(category, confidence, pages_examined, method):
+    return {"category": category, "confidence": confidence,
+            "pages_examined": pages_examined, "method": method}
+
+
+def route_document(document, max_pages=None):
+    """
+    Incremental router: reads the text layer page by page and stops at the first
+    decisive hit (the DMS table headers). Scanned PDFs get a low-DPI OCR of the
+    header band of page 1 before falling back to OCR of the whole first page.
+    Returns the category, a confidence, the 1-based pages examined and the method used.
+    """
+    if not isinstance(document, ParsedDocument):
+        document = ParsedDocument(document)
+
+    # 1. Digital Text Check, one page at a time
+    seen_text = []
+    examined = []
+    page_total = document.page_count if max_pages is None else min(max_pages, document.page_count)
+    for page_index in range(page_total):
+        text = document.page_text(page_index)
+        examined.append(page_index + 1)
+        if text and text.strip():
+            seen_text.append(text)
+            # Headers can sit on different pages, so judge everything read so far
+            if _is_dms("\n".join(seen_text)):
+                return _decision("DMS", 1.0, examined, "text_layer")
+
+    if seen_text:
+        full_text = "\n".join(seen_text)
+        if _has_non_dms_keywords(full_text):
+            return _decision("Non-DMS", 0.8, examined, "text_layer")
+        return _decision("Non-DMS", 0.5, examined, "text_layer")
+
+    # 2. Scanned Fallback: header band of page 1 at low DPI
+    img = document.render_page(0, dpi=ROUTER_SCAN_DPI)
+    if img is None:
+        return _decision("Non-DMS", 0.5, examined, "empty")
+    band = img[:max(1, int(img.shape[0] * ROUTER_HEADER_BAND))]
+    band_text = " ".join(text for _, text, _ in ocr_image_tokens(band))
+    del img, band
+    if _is_dms(band_text):
+        return _decision("DMS", 0.9, [1], "ocr_header_band")
+
+    # 3. Still undecided: OCR page 1 at extraction DPI (tokens stay cached for extraction)
+    full_text = band_text + " " + document.ocr_page_text(0, dpi=OCR_DPI)
+    if _is_dms(full_text):
+        return _decision("DMS", 0.9, [1], "ocr_first_page")
+    if _has_non_dms_keywords(full_text):
+        return _decision("Non-DMS", 0.7, [1], "ocr_first_page")
+    return _decision("Non-DMS", 0.5, [1], "ocr_first_page")
+
+
+def categorize_document(document):
     """
     Categorizes PDF as DMS (Customer Eye) or Non-DMS (Non-Customer Eye).
     Works for both digital and scanned documents.
+    Accepts raw PDF bytes or a ParsedDocument that the extractors will reuse.
     """
-    full_text = ""
-    
-    # 1. Digital Text Check
-    with pdfplumber.open(io.BytesIO(pdf_bytes)) as pdf:
-        for page in pdf.pages:
-            text = page.extract_text()
-            if text and text.strip():
-                full_text += text + "\n"
-    
-    # 2. Scanned Fallback: OCR first page only
-    if not full_text.strip():
-        images = convert_from_bytes(pdf_bytes, first_page=1, last_page=1)
-        if images:
-            img_array = np.array(images[0])
-            result = router_ocr.ocr(img_array, cls=True)
-            if result and result[0]:
-                full_text = " ".join([line[1][0] for line in result[0]])
-
-    # 3. Decision Logic
-    # DMS (Customer Eye) contains table headers
-    if "Agreement" in full_text and ("Penal" in full_text or "Bounce" in full_text):
-        return "DMS"
-    
-    # Non-DMS (Non-Customer Eye) contains LAN/Waiver keywords
-    elif "LAN" in full_text or "P2W" in full_text or "waiver" in full_text.lower():
-        return "Non-DMS"
-        
-    return "Non-DMS"
\ No newline at end of file
+    return route_document(document)["category"]
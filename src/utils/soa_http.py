@@ -0,0 +1,127 @@
+import asyncio
+import os
+import threading
+import time
+
+import aiohttp
+
+try:
+    from .soa_index import normalize_key
+    from .soa_source import SoaSource
+except ImportError:
+    from soa_index import normalize_key
+    from soa_source import SoaSource
+
+SOA_HTTP_MAX_CONNECTIONS = int(os.getenv("SOA_HTTP_MAX_CONNECTIONS", "20"))
+SOA_HTTP_MAX_IN_FLIGHT = int(os.getenv("SOA_HTTP_MAX_IN_FLIGHT", "8"))
+SOA_HTTP_BULK_SIZE = int(os.getenv("SOA_HTTP_BULK_SIZE", "200"))
+SOA_HTTP_RETRIES = int(os.getenv("SOA_HTTP_RETRIES", "3"))
+SOA_HTTP_TIMEOUT = float(os.getenv("SOA_HTTP_TIMEOUT", "10"))
+SOA_HTTP_CACHE_TTL = float(os.getenv("SOA_HTTP_CACHE_TTL", "30"))
+
+
+class SoaServerError(Exception):
+    pass
+
+
+class HttpSoaSource(SoaSource):
+    """
+    SOA data server client. Keys are fetched in bulk (POST /soa/bulk) over a pool of
+    keep-alive connections, with bounded in-flight requests, retries with backoff and
+    a short-TTL cache (misses included) so repeated LANs in a run stay local.
+
+    Synchronous callers are served by a private event loop on a background thread,
+    so the client is usable from the graph nodes as well as from asyncio code.
+    """
+
+    def __init__(self, base_url, max_connections=SOA_HTTP_MAX_CONNECTIONS,
+                 max_in_flight=SOA_HTTP_MAX_IN_FLIGHT, bulk_size=SOA_HTTP_BULK_SIZE,
+                 retries=SOA_HTTP_RETRIES, timeout=SOA_HTTP_TIMEOUT, cache_ttl=SOA_HTTP_CACHE_TTL):
+        self.base_url = base_url.rstrip("/")
+        self.max_connections = max_connections
+        self.max_in_flight = max_in_flight
+        self.bulk_size = bulk_size
+        self.retries = retries
+        self.timeout = timeout
+        self.cache_ttl = cache_ttl
+        self.stats = {"requests": 0, "retries": 0, "cache_hits": 0}
+
+        self._cache = {}  # key -> (expires_at, summary or None)
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._loop.run_forever, name="soa-http", daemon=True)
+        self._thread.start()
+        self._session = None
+        self._semaphore = None
+
+    # ---------------- SYNC FACADE ---------------- #
+
+    def get_many(self, keys):
+        return asyncio.run_coroutine_threadsafe(self._get_many(keys), self._loop).result()
+
+    async def aget_many(self, keys):
+        # Runs on the client's own loop so the pooled session is never shared across loops
+        future = asyncio.run_coroutine_threadsafe(self._get_many(keys), self._loop)
+        return await asyncio.wrap_future(future)
+
+    def close(self):
+        if self._loop.is_closed():
+            return
+        if self._session is not None:
+            asyncio.run_coroutine_threadsafe(self._session.close(), self._loop).result()
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join()
+        self._loop.close()
+
+    # ---------------- ASYNC CORE ---------------- #
+
+    def _ensure_session(self):
+        if self._session is None:
+            connector = aiohttp.TCPConnector(limit=self.max_connections, keepalive_timeout=30)
+            self._session = aiohttp.ClientSession(
+                connector=connector, timeout=aiohttp.ClientTimeout(total=self.timeout))
+            self._semaphore = asyncio.Semaphore(self.max_in_flight)
+        return self._session
+
+    async def _get_many(self, keys):
+        wanted = sorted({normalize_key(k) for k in keys})
+        results, missing = {}, []
+        now = time.monotonic()
+        for key in wanted:
+            cached = self._cache.get(key)
+            if cached and cached[0] > now:
+                results[key] = cached[1]
+                self.stats["cache_hits"] += 1
+            else:
+                missing.append(key)
+
+        chunks = [missing[i:i + self.bulk_size] for i in range(0, len(missing), self.bulk_size)]
+        for fetched in await asyncio.gather(*(self._fetch_bulk(chunk) for chunk in chunks)):
+            expires_at = time.monotonic() + self.cache_ttl
+            for key, summary in fetched.items():
+                self._cache[key] = (expires_at, summary)
+                results[key] = summary
+        return {key: results.get(key) for key in wanted}
+
+    async def _fetch_bulk(self, keys):
+        session = self._ensure_session()
+        last_error = None
+        for attempt in range(self.retries + 1):
+            if attempt:
+                self.stats["retries"] += 1
+                await asyncio.sleep(min(2.0, 0.1 * 2 ** attempt))
+            try:
+                async with self._semaphore:
+                    self.stats["requests"] += 1
+                    async with session.post(f"{self.base_url}/soa/bulk", json={"keys": keys}) as response:
+                        if response.status >= 500:
+                            last_error = SoaServerError(f"SOA server returned {response.status}")
+                            continue
+                        if response.status >= 400:
+                            # Client errors will not improve on retry
+                            raise SoaServerError(f"SOA server rejected the lookup: {response.status}")
+                        payload = await response.json()
+                found = {normalize_key(k): v for k, v in payload["results"].items()}
+                return {key: found.get(key) for key in keys}
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                last_error = e
+        raise SoaServerError(f"SOA lookup failed after {self.retries + 1} attempts: {last_error}")
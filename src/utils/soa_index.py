@@ -0,0 +1,204 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+
+SOA_DB_PATH = os.getenv("SOA_DB_PATH", "soa-data-server/soa_database")
+SOA_INDEX_PATH = os.getenv("SOA_INDEX_PATH", os.path.join("data", "cache", "soa_index.sqlite"))
+# How often lookups re-stat the SOA folder for new or changed files
+SOA_INDEX_REFRESH_SECONDS = float(os.getenv("SOA_INDEX_REFRESH_SECONDS", "60"))
+
+# Key sources, in lookup priority: the file name the validators used to open, then the finreference inside
+KEY_FROM_FILE = 0
+KEY_FROM_FINREFERENCE = 1
+
+
+def normalize_key(key):
+    """Normalize LAN/FIN reference for safe comparison."""
+    return str(key).strip().upper()
+
+
+def summarize_soa(soa_data):
+    """Precomputes what validation needs from one SOA file."""
+    statement = soa_data.get("statementOfAccount", {})
+    components = {}
+    for component in statement.get("soa_summary_report", []):
+        name = component.get("component")
+        if name and name not in components:
+            components[name] = float(component.get("overdue", 0))
+    return {
+        "finreference": statement.get("finreference", ""),
+        "total_overdue": components.get("total_overdue"),
+        "components": components,
+    }
+
+
+class SoaIndex:
+    """
+    Persistent SQLite index over the SOA folder keyed by normalized finreference
+    (and file name), holding the precomputed overdue components per agreement.
+    Only files whose mtime or size changed are re-parsed on refresh.
+    """
+
+    def __init__(self, soa_dir=SOA_DB_PATH, index_path=SOA_INDEX_PATH,
+                 refresh_interval=SOA_INDEX_REFRESH_SECONDS, prebuilt=False):
+        self.soa_dir = soa_dir
+        self.index_path = index_path
+        self.refresh_interval = refresh_interval
+        # prebuilt: another process just built the index, so the first lookup does not rescan the folder
+        self._last_refresh = time.monotonic() if prebuilt else None
+        self._lock = threading.Lock()
+
+        os.makedirs(os.path.dirname(index_path) or ".", exist_ok=True)
+        self._conn = sqlite3.connect(index_path, timeout=30, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript("""
+            CREATE TABLE IF NOT EXISTS soa_files (
+                file_name TEXT PRIMARY KEY,
+                mtime_ns INTEGER NOT NULL,
+                size INTEGER NOT NULL,
+                finreference TEXT,
+                total_overdue REAL,
+                components TEXT
+            );
+            CREATE TABLE IF NOT EXISTS soa_keys (
+                key TEXT NOT NULL,
+                source INTEGER NOT NULL,
+                file_name TEXT NOT NULL,
+                PRIMARY KEY (key, source)
+            );
+            CREATE INDEX IF NOT EXISTS idx_soa_keys_file ON soa_keys(file_name);
+        """)
+
+    # ---------------- BUILD ---------------- #
+
+    def refresh(self, force=False):
+        """Brings the index in line with the SOA folder. Returns counts of changed files."""
+        with self._lock:
+            now = time.monotonic()
+            if not force and self._last_refresh is not None and now - self._last_refresh < self.refresh_interval:
+                return None
+            stats = self._refresh()
+            self._last_refresh = time.monotonic()
+            return stats
+
+    def _refresh(self):
+        stats = {"added": 0, "updated": 0, "removed": 0, "errors": 0}
+        on_disk = {}
+        if os.path.isdir(self.soa_dir):
+            with os.scandir(self.soa_dir) as entries:
+                for entry in entries:
+                    if entry.name.endswith(".json") and entry.is_file():
+                        st = entry.stat()
+                        on_disk[entry.name] = (st.st_mtime_ns, st.st_size)
+
+        indexed = {name: (mtime_ns, size) for name, mtime_ns, size in
+                   self._conn.execute("SELECT file_name, mtime_ns, size FROM soa_files")}
+
+        with self._conn:
+            for file_name in indexed.keys() - on_disk.keys():
+                self._delete(file_name)
+                stats["removed"] += 1
+
+            for file_name, signature in on_disk.items():
+                previous = indexed.get(file_name)
+                if previous == signature:
+                    continue
+                try:
+                    with open(os.path.join(self.soa_dir, file_name), "r") as f:
+                        summary = summarize_soa(json.load(f))
+                except Exception as e:
+                    print(f"Error indexing {file_name}: {e}")
+                    stats["errors"] += 1
+                    continue
+                self._delete(file_name)
+                self._insert(file_name, signature, summary)
+                stats["updated" if previous else "added"] += 1
+
+        if any(stats.values()):
+            print(f"--- SOA index refreshed: {stats} ---")
+        return stats
+
+    def _delete(self, file_name):
+        self._conn.execute("DELETE FROM soa_files WHERE file_name = ?", (file_name,))
+        self._conn.execute("DELETE FROM soa_keys WHERE file_name = ?", (file_name,))
+
+    def _insert(self, file_name, signature, summary):
+        self._conn.execute(
+            "INSERT INTO soa_files VALUES (?, ?, ?, ?, ?, ?)",
+            (file_name, signature[0], signature[1], summary["finreference"],
+             summary["total_overdue"], json.dumps(summary["components"])))
+        keys = [(normalize_key(file_name[:-len(".json")]), KEY_FROM_FILE)]
+        if summary["finreference"]:
+            keys.append((normalize_key(summary["finreference"]), KEY_FROM_FINREFERENCE))
+        self._conn.executemany(
+            "INSERT OR REPLACE INTO soa_keys VALUES (?, ?, ?)",
+            [(key, source, file_name) for key, source in keys])
+
+    # ---------------- LOOKUP ---------------- #
+
+    def lookup(self, key):
+        """Indexed point lookup. Returns the SOA summary for an agreement/LAN, or None."""
+        return self.get_many([key])[normalize_key(key)]
+
+    def get_many(self, keys):
+        """Bulk lookup: {normalized key: summary or None} for every requested key."""
+        self.refresh()
+        wanted = sorted({normalize_key(k) for k in keys})
+        found = {}
+        with self._lock:
+            for i in range(0, len(wanted), 500):
+                chunk = wanted[i:i + 500]
+                placeholders = ",".join("?" * len(chunk))
+                rows = self._conn.execute(f"""
+                    SELECT k.key, k.source, f.file_name, f.finreference, f.total_overdue, f.components
+                    FROM soa_keys k JOIN soa_files f ON f.file_name = k.file_name
+                    WHERE k.key IN ({placeholders})""", chunk).fetchall()
+                for key, source, file_name, finreference, total_overdue, components in rows:
+                    if key in found and found[key][0] <= source:
+                        continue
+                    found[key] = (source, {
+                        "file_name": file_name,
+                        "finreference": finreference,
+                        "total_overdue": total_overdue,
+                        "components": json.loads(components),
+                    })
+        return {key: found[key][1] if key in found else None for key in wanted}
+
+    def close(self):
+        self._conn.close()
+
+
+_index = None
+_index_lock = threading.Lock()
+_index_prebuilt = False
+
+
+def get_soa_index():
+    """Process-wide index, refreshed at most every SOA_INDEX_REFRESH_SECONDS."""
+    global _index
+    if _index is None:
+        with _index_lock:
+            if _index is None:
+                _index = SoaIndex(prebuilt=_index_prebuilt)
+    return _index
+
+
+def build_soa_index(soa_dir=SOA_DB_PATH, index_path=SOA_INDEX_PATH):
+    """
+    Builds or refreshes the index file on a connection of its own and closes it, so it
+    can run in a parent process before workers are started (connections must not cross
+    a fork). Workers that call use_prebuilt_soa_index() then only read it.
+    """
+    index = SoaIndex(soa_dir=soa_dir, index_path=index_path)
+    try:
+        return index.refresh(force=True)
+    finally:
+        index.close()
+
+
+def use_prebuilt_soa_index():
+    """Worker processes: skip the initial rescan; later refreshes only pick up changed files."""
+    global _index_prebuilt
+    _index_prebuilt = True
@@ -0,0 +1,99 @@
+import abc
+import asyncio
+import os
+import threading
+
+try:
+    from .soa_index import build_soa_index, get_soa_index, normalize_key, use_prebuilt_soa_index
+except ImportError:
+    from soa_index import build_soa_index, get_soa_index, normalize_key, use_prebuilt_soa_index
+
+# "filesystem" reads the local SOA folder through the index, "http" calls the SOA data server
+SOA_SOURCE = os.getenv("SOA_SOURCE", "filesystem")
+SOA_SERVER_URL = os.getenv("SOA_SERVER_URL", "http://127.0.0.1:8081")
+
+
+class SoaSource(abc.ABC):
+    """
+    Where the validators get SOA summaries from. Every backend answers bulk lookups
+    with {normalized key: summary or None}; a summary carries file_name, finreference,
+    total_overdue and the per-component overdue figures.
+    """
+
+    def get(self, key):
+        return self.get_many([key])[normalize_key(key)]
+
+    def lookup(self, key):
+        return self.get(key)
+
+    @abc.abstractmethod
+    def get_many(self, keys):
+        """{normalized key: summary or None} for every key."""
+
+    async def aget_many(self, keys):
+        """Non-blocking bulk lookup for asyncio callers."""
+        return await asyncio.to_thread(self.get_many, keys)
+
+    def close(self):
+        pass
+
+
+class FilesystemSoaSource(SoaSource):
+    """The local soa_database folder, served through the persistent SoaIndex."""
+
+    def __init__(self, index=None):
+        self.index = index or get_soa_index()
+
+    def get_many(self, keys):
+        return self.index.get_many(keys)
+
+
+_source = None
+_source_lock = threading.Lock()
+
+
+def get_soa_source():
+    """Process-wide SOA backend selected by SOA_SOURCE."""
+    global _source
+    if _source is None:
+        with _source_lock:
+            if _source is None:
+                if SOA_SOURCE == "http":
+                    try:
+                        from .soa_http import HttpSoaSource
+                    except ImportError:
+                        from soa_http import HttpSoaSource
+                    _source = HttpSoaSource(SOA_SERVER_URL)
+                elif SOA_SOURCE == "filesystem":
+                    _source = FilesystemSoaSource()
+                else:
+                    raise ValueError(f"Unknown SOA_SOURCE: {SOA_SOURCE!r} (expected 'filesystem' or 'http')")
+    return _source
+
+
+def close_soa_source():
+    """Closes the process-wide backend (the HTTP client's pooled session); the next lookup opens a new one."""
+    global _source
+    with _source_lock:
+        if _source is not None:
+            _source.close()
+            _source = None
+
+
+def prepare_soa_for_workers():
+    """
+    Builds the filesystem SOA index once in the parent, so worker processes do not each parse
+    the whole SOA folder in competing write transactions. Returns True when workers should
+    call use_prebuilt_soa_index().
+    """
+    if SOA_SOURCE != "filesystem":
+        return False
+    build_soa_index()
+    return True
+
+
+def set_soa_source(source):
+    """Swaps the backend, e.g. to point a run at a stand-in server."""
+    global _source
+    with _source_lock:
+        _source = source
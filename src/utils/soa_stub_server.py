@@ -0,0 +1,83 @@
+"""
+Local stand-in for the SOA data server, answering from the soa_database folder
+through the SoaIndex. Useful for trying the HTTP backend without the real service:
+
+    python -m src.utils.soa_stub_server --port 8081
+    SOA_SOURCE=http SOA_SERVER_URL=http://127.0.0.1:8081 python main.py
+"""
+import argparse
+import asyncio
+import threading
+
+from aiohttp import web
+
+try:
+    from .soa_index import SoaIndex, SOA_DB_PATH, SOA_INDEX_PATH
+except ImportError:
+    from soa_index import SoaIndex, SOA_DB_PATH, SOA_INDEX_PATH
+
+
+def build_app(index):
+    async def bulk(request):
+        payload = await request.json()
+        keys = payload.get("keys", [])
+        results = await asyncio.to_thread(index.get_many, keys)
+        return web.json_response({"results": results})
+
+    async def single(request):
+        summary = await asyncio.to_thread(index.lookup, request.match_info["key"])
+        if summary is None:
+            raise web.HTTPNotFound()
+        return web.json_response(summary)
+
+    async def health(request):
+        return web.json_response({"status": "ok"})
+
+    app = web.Application()
+    app.router.add_post("/soa/bulk", bulk)
+    app.router.add_get("/soa/{key}", single)
+    app.router.add_get("/healthz", health)
+    return app
+
+
+def start_stub_server(soa_dir=SOA_DB_PATH, index_path=SOA_INDEX_PATH, host="127.0.0.1", port=0):
+    """
+    Serves the stand-in on a background thread. Returns (base_url, stop);
+    port 0 picks a free port.
+    """
+    index = SoaIndex(soa_dir=soa_dir, index_path=index_path)
+    loop = asyncio.new_event_loop()
+    runner = web.AppRunner(build_app(index))
+    ready = threading.Event()
+    bound = {}
+
+    async def _start():
+        await runner.setup()
+        site = web.TCPSite(runner, host, port)
+        await site.start()
+        bound["port"] = runner.addresses[0][1]
+        ready.set()
+
+    thread = threading.Thread(target=lambda: (loop.run_until_complete(_start()), loop.run_forever()),
+                              name="soa-stub-server", daemon=True)
+    thread.start()
+    ready.wait()
+
+    def stop():
+        asyncio.run_coroutine_threadsafe(runner.cleanup(), loop).result()
+        loop.call_soon_threadsafe(loop.stop)
+        thread.join()
+        index.close()
+
+    return f"http://{host}:{bound['port']}", stop
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Stand-in SOA data server backed by the local SOA folder")
+    parser.add_argument("--soa-dir", default=SOA_DB_PATH)
+    parser.add_argument("--index-path", default=SOA_INDEX_PATH)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8081)
+    args = parser.parse_args()
+    web.run_app(build_app(SoaIndex(soa_dir=args.soa_dir, index_path=args.index_path)),
+                host=args.host, port=args.port)
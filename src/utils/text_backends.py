@@ -0,0 +1,223 @@
+"""
+Text-layer backends for ParsedDocument. Every backend opens a PDF from bytes and
+returns, per page, the extracted text and how many images the page carries (used
+to decide which text-less pages need OCR).
+
+    pdfplumber  layout-aware char clustering; the reference output, and the slowest
+    pypdfium2   PDFium's native text extraction; much faster
+    pdfminer    pdfminer.six with layout analysis reduced to line grouping
+
+Selected per run with TEXT_BACKEND. Compare speed and agreement-row parity on a folder:
+
+    python -m src.utils.text_backends raw_files --backends pdfplumber pypdfium2 pdfminer
+"""
+import argparse
+import io
+import os
+import threading
+import time
+
+# pdfplumber | pypdfium2 | pdfminer
+TEXT_BACKEND = os.getenv("TEXT_BACKEND", "pdfplumber")
+
+# PDFium is not thread-safe, even across documents, and the async runner executes
+# graph nodes in threads; every pypdfium2 call goes through this lock
+_pdfium_lock = threading.Lock()
+
+
+class PdfPlumberText:
+    name = "pdfplumber"
+
+    def __init__(self, pdf_bytes):
+        import pdfplumber
+        self._pdf = pdfplumber.open(io.BytesIO(pdf_bytes))
+
+    def page_count(self):
+        return len(self._pdf.pages)
+
+    def read_page(self, page_index):
+        page = self._pdf.pages[page_index]
+        text, image_count = page.extract_text() or "", len(page.images)
+        page.flush_cache()
+        return text, image_count
+
+    def close(self):
+        self._pdf.close()
+
+
+class PdfiumText:
+    name = "pypdfium2"
+
+    def __init__(self, pdf_bytes):
+        import pypdfium2
+        import pypdfium2.raw as pdfium_c
+        self._image_type = pdfium_c.FPDF_PAGEOBJ_IMAGE
+        with _pdfium_lock:
+            self._pdf = pypdfium2.PdfDocument(pdf_bytes)
+
+    def page_count(self):
+        with _pdfium_lock:
+            return len(self._pdf)
+
+    def read_page(self, page_index):
+        with _pdfium_lock:
+            page = self._pdf[page_index]
+            try:
+                textpage = page.get_textpage()
+                try:
+                    # PDFium's own line breaks split table rows at glyphs of another height,
+                    # so rows are rebuilt from its text segments and their positions
+                    lines = []
+                    for i in range(textpage.count_rects()):
+                        left, bottom, right, top = textpage.get_rect(i)
+                        text = textpage.get_text_bounded(left, bottom, right, top).strip()
+                        if text:
+                            lines.append((bottom, left, top - bottom, text))
+                finally:
+                    textpage.close()
+                image_count = sum(1 for _ in page.get_objects(filter=[self._image_type]))
+            finally:
+                page.close()
+        return "\n".join(_join_rows(lines)), image_count
+
+    def close(self):
+        with _pdfium_lock:
+            self._pdf.close()
+
+
+class PdfMinerText:
+    name = "pdfminer"
+
+    def __init__(self, pdf_bytes):
+        from pdfminer.converter import PDFPageAggregator
+        from pdfminer.layout import LAParams
+        from pdfminer.pdfinterp import PDFPageInterpreter, PDFResourceManager
+        from pdfminer.pdfpage import PDFPage
+
+        # boxes_flow=None skips the costly reading-order analysis; lines are still grouped
+        self._device = PDFPageAggregator(PDFResourceManager(), laparams=LAParams(boxes_flow=None))
+        self._interpreter = PDFPageInterpreter(self._device.rsrcmgr, self._device)
+        self._stream = io.BytesIO(pdf_bytes)
+        self._pages = list(PDFPage.get_pages(self._stream))
+
+    def page_count(self):
+        return len(self._pages)
+
+    def read_page(self, page_index):
+        from pdfminer.layout import LTFigure, LTImage, LTTextBox, LTTextLine
+
+        self._interpreter.process_page(self._pages[page_index])
+        lines, image_count = [], 0
+        stack = list(self._device.get_result())
+        while stack:
+            item = stack.pop()
+            if isinstance(item, LTTextLine):
+                text = item.get_text().strip()
+                if text:
+                    lines.append((item.y0, item.x0, item.height, text))
+            elif isinstance(item, (LTTextBox, LTFigure)):
+                stack.extend(item)
+            elif isinstance(item, LTImage):
+                image_count += 1
+        return "\n".join(_join_rows(lines)), image_count
+
+    def close(self):
+        self._stream.close()
+
+
+def _join_rows(lines):
+    """
+    Page rows the way pdfplumber lays them out: text segments top to bottom,
+    segments that share a baseline joined from left to right.
+    """
+    rows, current, current_y = [], [], None
+    for y0, x0, height, text in sorted(lines, key=lambda line: (-line[0], line[1])):
+        if current and abs(current_y - y0) > max(height, 1.0) / 2:
+            rows.append(current)
+            current = []
+        if not current:
+            current_y = y0
+        current.append((x0, text))
+    if current:
+        rows.append(current)
+    return [" ".join(text for _, text in sorted(row)) for row in rows]
+
+
+BACKENDS = {backend.name: backend for backend in (PdfPlumberText, PdfiumText, PdfMinerText)}
+
+
+def open_text_backend(pdf_bytes, backend=None):
+    backend = backend or TEXT_BACKEND
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown TEXT_BACKEND: {backend!r} (expected one of {', '.join(BACKENDS)})")
+    return BACKENDS[backend](pdf_bytes)
+
+
+# ---------------- COMPARISON ---------------- #
+
+def read_all(pdf_bytes, backend):
+    handle = open_text_backend(pdf_bytes, backend)
+    try:
+        return [handle.read_page(i) for i in range(handle.page_count())]
+    finally:
+        handle.close()
+
+
+def _row_keys(pages):
+    # Same row parser as the DMS extractor's text-layer path
+    try:
+        from .patterns import scan_text
+    except ImportError:
+        from patterns import scan_text
+    full_text = "".join(text + "\n" for text, _ in pages if text.strip())
+    return [(r["Agreement Number"], r["Penal Charge"], r["Bounce Charge"], r["Total Amount to be Waived off"])
+            for r in scan_text(full_text, "dms", parse_rows=True)["rows"]]
+
+
+def compare_backends(pdf_paths, backends=tuple(BACKENDS), reference="pdfplumber", repeat=3):
+    """
+    Times every backend on every PDF (best of `repeat`) and checks that the agreement
+    rows and OCR page decisions match the reference backend.
+    Returns {backend: {"seconds", "pages", "row_mismatches", "image_mismatches", "files"}}.
+    """
+    report = {b: {"seconds": 0.0, "pages": 0, "row_mismatches": 0, "image_mismatches": 0, "files": 0}
+              for b in backends}
+    for path in pdf_paths:
+        with open(path, "rb") as f:
+            pdf_bytes = f.read()
+        expected = read_all(pdf_bytes, reference)
+        expected_rows = _row_keys(expected)
+        for backend in backends:
+            best = None
+            for _ in range(repeat):
+                start = time.perf_counter()
+                pages = read_all(pdf_bytes, backend)
+                elapsed = time.perf_counter() - start
+                best = elapsed if best is None else min(best, elapsed)
+            stats = report[backend]
+            stats["seconds"] += best
+            stats["pages"] += len(pages)
+            stats["files"] += 1
+            if _row_keys(pages) != expected_rows:
+                stats["row_mismatches"] += 1
+                print(f"--- {backend}: agreement rows differ from {reference} in {os.path.basename(path)} ---")
+            if [bool(n) for _, n in pages] != [bool(n) for _, n in expected]:
+                stats["image_mismatches"] += 1
+    return report
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compare text-layer backends on a folder of PDFs")
+    parser.add_argument("folder", nargs="?", default="raw_files")
+    parser.add_argument("--backends", nargs="+", default=list(BACKENDS), choices=list(BACKENDS))
+    parser.add_argument("--reference", default="pdfplumber", choices=list(BACKENDS))
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    pdfs = sorted(os.path.join(args.folder, f) for f in os.listdir(args.folder) if f.lower().endswith(".pdf"))
+    report = compare_backends(pdfs, args.backends, args.reference, args.repeat)
+    print(f"\n{'backend':<12}{'files':>7}{'pages':>7}{'seconds':>10}{'ms/page':>9}{'row diffs':>11}{'image diffs':>13}")
+    for backend, s in report.items():
+        per_page = 1000 * s["seconds"] / s["pages"] if s["pages"] else 0.0
+        print(f"{backend:<12}{s['files']:>7}{s['pages']:>7}{s['seconds']:>10.3f}{per_page:>9.1f}"
+              f"{s['row_mismatches']:>11}{s['image_mismatches']:>13}")
@@ -0,0 +1,119 @@
+import os
+import re
+
+import numpy as np
+
+# Tokens below this OCR confidence are ignored when building table rows
+OCR_MIN_CONFIDENCE = float(os.getenv("OCR_MIN_CONFIDENCE", "0.5"))
+# A new row starts when the vertical gap between token centers exceeds this many line heights
+ROW_GAP_FACTOR = float(os.getenv("ROW_GAP_FACTOR", "0.6"))
+
+ID_PATTERN = re.compile(r'\b[A-Z0-9]{8}\b')
+NUMBER_PATTERN = re.compile(r'\d+(?:,\d{3})*(?:\.\d+)?')
+
+
+class TokenTable:
+    """
+    Column-oriented OCR tokens (center x/y, box height, confidence, page, text)
+    so row clustering and column assignment run as array operations.
+    """
+
+    def __init__(self, cx, cy, height, conf, page, text):
+        self.cx = cx
+        self.cy = cy
+        self.height = height
+        self.conf = conf
+        self.page = page
+        self.text = text
+
+    @classmethod
+    def from_ocr(cls, page_tokens, page=0):
+        """page_tokens: [(box, text, conf), ...] as cached by ParsedDocument."""
+        if not page_tokens:
+            empty = np.empty(0)
+            return cls(empty, empty, empty, empty, np.empty(0, dtype=int), np.empty(0, dtype=object))
+        boxes = np.array([box for box, _, _ in page_tokens], dtype=float)  # (n, 4, 2)
+        text = np.empty(len(page_tokens), dtype=object)
+        text[:] = [t.strip() for _, t, _ in page_tokens]
+        return cls(
+            cx=(boxes[:, 0, 0] + boxes[:, 2, 0]) / 2,
+            cy=(boxes[:, 0, 1] + boxes[:, 2, 1]) / 2,
+            height=boxes[:, :, 1].max(axis=1) - boxes[:, :, 1].min(axis=1),
+            conf=np.array([c for _, _, c in page_tokens], dtype=float),
+            page=np.full(len(page_tokens), page, dtype=int),
+            text=text,
+        )
+
+    def __len__(self):
+        return len(self.text)
+
+    def take(self, index):
+        return TokenTable(self.cx[index], self.cy[index], self.height[index],
+                          self.conf[index], self.page[index], self.text[index])
+
+    def confident(self, min_conf=OCR_MIN_CONFIDENCE):
+        return self.take(self.conf >= min_conf)
+
+    def row_threshold(self):
+        """Row gap measured from the page itself, so it scales with DPI and font size."""
+        if not len(self):
+            return 0.0
+        return ROW_GAP_FACTOR * max(float(np.median(self.height)), 1.0)
+
+    def cluster_rows(self, threshold=None):
+        """
+        Returns (table sorted by row then x, row id per token). Like the old group_by_y,
+        consecutive tokens in y order join a row while their centers are within threshold.
+        """
+        threshold = self.row_threshold() if threshold is None else threshold
+        by_y = np.lexsort((self.cy, self.page))
+        cy, page = self.cy[by_y], self.page[by_y]
+        new_row = np.ones(len(by_y), dtype=bool)
+        new_row[1:] = (np.diff(cy) >= threshold) | (np.diff(page) != 0)
+        rows_in_y_order = np.cumsum(new_row) - 1
+
+        row_of = np.empty(len(by_y), dtype=int)
+        row_of[by_y] = rows_in_y_order
+        by_row_then_x = np.lexsort((self.cx, row_of))
+        return self.take(by_row_then_x), row_of[by_row_then_x]
+
+
+def extract_rows(table):
+    """
+    Waiver rows from one page of tokens: the first 8-char agreement ID of a row plus
+    its first three amounts (Penal, Bounce, Total), the other words forming the Reason.
+    """
+    table = table.confident()
+    if not len(table):
+        return []
+    table, row_ids = table.cluster_rows()
+
+    # Each regex runs once per token instead of several times per row
+    is_id = np.fromiter((ID_PATTERN.fullmatch(t) is not None for t in table.text), dtype=bool, count=len(table))
+    is_num = np.fromiter((NUMBER_PATTERN.fullmatch(t) is not None for t in table.text), dtype=bool, count=len(table))
+
+    starts = np.flatnonzero(np.r_[True, row_ids[1:] != row_ids[:-1]])
+    ends = np.r_[starts[1:], len(table)]
+    positions = np.arange(len(table))
+
+    # Column assignment: first ID per row and the rank of every number within its row
+    first_id = np.minimum.reduceat(np.where(is_id, positions, len(table)), starts)
+    num_count = np.add.reduceat(is_num.astype(int), starts)
+    num_rank = np.cumsum(is_num) - np.repeat(np.r_[0, np.cumsum(num_count)[:-1]], ends - starts)
+
+    extracted = []
+    for row, (start, end) in enumerate(zip(starts, ends)):
+        if first_id[row] >= end or num_count[row] < 3:
+            continue
+        id_text = table.text[first_id[row]]
+        span = slice(start, end)
+        numbers = table.text[span][is_num[span] & (num_rank[span] <= 3)]
+        reason_mask = ~is_num[span] & (table.text[span] != id_text)
+        extracted.append({
+            "Agreement Number": id_text,
+            "Penal Charge": numbers[0],
+            "Bounce Charge": numbers[1],
+            "Total Amount to be Waived off": numbers[2],
+            "Reason": " ".join(table.text[span][reason_mask]),
+        })
+    return extracted
@@ -1,33 +1,51 @@
 import json
 import os
 
-def validate_waiver_request(extracted_data):
+try:
+    from .soa_index import normalize_key, SOA_DB_PATH
+    from .soa_source import get_soa_source
+    from .instrumentation import track
+except ImportError:
+    from soa_index import normalize_key, SOA_DB_PATH
+    from soa_source import get_soa_source
+    from instrumentation import track
+
+
+def _soa_lookup(soa_records, keys):
+    """
+    Per-key lookup over the prefetched records of a batch when given; otherwise the
+    document's own keys are fetched from the configured SOA source in one bulk call.
+    """
+    if soa_records is None:
+        with track("soa"):
+            soa_records = get_soa_source().get_many({normalize_key(k) for k in keys})
+    return lambda key: soa_records.get(normalize_key(key))
+
+
+def validate_waiver_request(extracted_data, soa_records=None):
     """
     Validates extracted waiver details against the SOA database with partial approval logic.
+    soa_records: optional {normalized key: SOA summary} already fetched by validate_batch.
     Path: src/utils/validator.py
     """
-    soa_db_path = "soa-data-server/soa_database"
+    details = extracted_data.get("waiver_details", [])
+    lookup = _soa_lookup(soa_records, [d["Agreement Number"] for d in details])
     validated_results = []
 
-    for detail in extracted_data.get("waiver_details", []):
+    for detail in details:
         agreement_no = detail["Agreement Number"]
         extracted_waived_amt = float(detail["Total Amount to be Waived off"])
         
-        soa_file_path = os.path.join(soa_db_path, f"{agreement_no}.json")
+        # Precomputed overdue from the SOA index instead of parsing the SOA file
+        soa_record = lookup(agreement_no)
         
         recommendation = ""
         validation_status = "Pending"
         db_total_overdue = 0
 
-        if os.path.exists(soa_file_path):
-            with open(soa_file_path, 'r') as f:
-                soa_data = json.load(f)
-            
-            summary_report = soa_data.get("statementOfAccount", {}).get("soa_summary_report", [])
-            for component in summary_report:
-                if component.get("component") == "total_overdue":
-                    db_total_overdue = float(component.get("overdue", 0))
-                    break
+        if soa_record is not None:
+            if soa_record["total_overdue"] is not None:
+                db_total_overdue = soa_record["total_overdue"]
             
             # Logic Update:
             if extracted_waived_amt >= db_total_overdue:
@@ -56,7 +74,7 @@ def validate_waiver_request(extracted_data):
 
 
 
-soa_db_path = "soa-data-server/soa_database"
+soa_db_path = SOA_DB_PATH
 def clean_lan(lan):
     """Normalize LAN/FIN reference for safe comparison."""
     return lan.strip().upper()
@@ -92,35 +110,29 @@ def load_soa_records():
     return soa_map
 
 
-def validate_non_dms_request(extracted_data):
+def validate_non_dms_request(extracted_data, soa_records=None):
     """
     New validation logic for Non-DMS requests.
     If the LAN is found, it identifies the total overdue and recommends approval.
+    soa_records: optional {normalized key: SOA summary} already fetched by validate_batch.
     """
-    soa_db_path = "soa-data-server/soa_database"
-    validated_results = []
-    
     # Extract the list of LANs found by the Non-DMS extractor
     lans = extracted_data.get("metadata", {}).get("fin_reference_no", [])
+    lookup = _soa_lookup(soa_records, lans)
+    validated_results = []
     
     for lan in lans:
-        # Match case-insensitive filename
-        soa_file_path = os.path.join(soa_db_path, f"{lan.upper()}.json")
+        # Case-insensitive lookup on the normalized LAN
+        soa_record = lookup(lan)
         
         recommendation = f"Error: LAN {lan} not found in database"
         validation_status = "Error"
         db_total_overdue = 0
 
-        if os.path.exists(soa_file_path):
-            with open(soa_file_path, 'r') as f:
-                soa_data = json.load(f)
-            
-            # Find total_overdue in the summary report
-            summary = soa_data.get("statementOfAccount", {}).get("soa_summary_report", [])
-            for component in summary:
-                if component.get("component") == "total_overdue":
-                    db_total_overdue = float(component.get("overdue", 0))
-                    break
+        if soa_record is not None:
+            # total_overdue precomputed from the summary report
+            if soa_record["total_overdue"] is not None:
+                db_total_overdue = soa_record["total_overdue"]
             
             # Specific terminology for Non-DMS as requested
             if db_total_overdue > 0:
@@ -138,4 +150,62 @@ def validate_non_dms_request(extracted_data):
         })
 
     extracted_data["validation_results"] = validated_results
-    return extracted_data
\ No newline at end of file
+    return extracted_data
+
+
+# ---------------- BATCH VALIDATION ---------------- #
+
+def collect_agreement_keys(extractions):
+    """Every agreement number / LAN referenced by a run's extractions, deduplicated."""
+    keys = set()
+    for data in extractions:
+        if data.get("category") == "DMS":
+            keys.update(d["Agreement Number"] for d in data.get("waiver_details", []))
+        else:
+            keys.update(data.get("metadata", {}).get("fin_reference_no", []))
+    return {normalize_key(k) for k in keys}
+
+
+def validate_batch(extractions):
+    """
+    Validates many documents with a single bulk SOA lookup for all of their agreements.
+    Each extraction is validated in place exactly as the per-document validators would;
+    returns a list with None or the error message for each document. If the bulk
+    lookup fails, every document in the batch gets that error.
+    """
+    try:
+        with track("soa"):
+            soa_records = get_soa_source().get_many(collect_agreement_keys(extractions))
+    except Exception as e:
+        return _lookup_failed(extractions, e)
+    return _validate_with_records(extractions, soa_records)
+
+
+async def avalidate_batch(extractions):
+    """validate_batch for asyncio callers: the bulk SOA lookup does not block the event loop."""
+    try:
+        with track("soa"):
+            soa_records = await get_soa_source().aget_many(collect_agreement_keys(extractions))
+    except Exception as e:
+        return _lookup_failed(extractions, e)
+    return _validate_with_records(extractions, soa_records)
+
+
+def _lookup_failed(extractions, error):
+    # One unreachable SOA source fails this batch only; the run keeps writing the rest
+    print(f"--- Bulk SOA lookup failed for {len(extractions)} documents: {error} ---")
+    return [f"SOA lookup failed: {type(error).__name__}: {error}"] * len(extractions)
+
+
+def _validate_with_records(extractions, soa_records):
+    errors = []
+    for data in extractions:
+        try:
+            if data.get("category") == "DMS":
+                validate_waiver_request(data, soa_records)
+            else:
+                validate_non_dms_request(data, soa_records)
+            errors.append(None)
+        except Exception as e:
+            errors.append(f"{type(e).__name__}: {e}")
+    return errors
@@ -0,0 +1,37 @@
+# Bump these whenever a change alters the JSON a document produces.
+# Cached results from other versions are ignored and purged.
+EXTRACTOR_VERSION = "3"
+RULESET_VERSION = "1"
+
+try:
+    from .document import TEXT_LAYER_MIN_CHARS
+    from .roi_ocr import OCR_ROI_MODE, ROI_SCAN_DPI
+    from .router import ROUTER_HEADER_BAND, ROUTER_SCAN_DPI
+    from .text_backends import TEXT_BACKEND
+    from .token_table import OCR_MIN_CONFIDENCE, ROW_GAP_FACTOR
+except ImportError:
+    from document import TEXT_LAYER_MIN_CHARS
+    from roi_ocr import OCR_ROI_MODE, ROI_SCAN_DPI
+    from router import ROUTER_HEADER_BAND, ROUTER_SCAN_DPI
+    from text_backends import TEXT_BACKEND
+    from token_table import OCR_MIN_CONFIDENCE, ROW_GAP_FACTOR
+
+
+def pipeline_version():
+    version = f"extractor-{EXTRACTOR_VERSION}/rules-{RULESET_VERSION}"
+    # Text layers differ slightly between backends, so results are cached per backend
+    if TEXT_BACKEND != "pdfplumber":
+        version += f"/text-{TEXT_BACKEND}"
+    # The threshold decides which pages are OCR'd instead of read from the text layer
+    if TEXT_LAYER_MIN_CHARS != 10:
+        version += f"/minchars-{TEXT_LAYER_MIN_CHARS}"
+    # A low-resolution header scan can route a scanned document differently
+    if (ROUTER_SCAN_DPI, ROUTER_HEADER_BAND) != (100, 0.4):
+        version += f"/route-{ROUTER_SCAN_DPI}-{ROUTER_HEADER_BAND:g}"
+    # Region-of-interest OCR reads other rows (and reports ocr_roi), so its results are kept apart
+    if OCR_ROI_MODE:
+        version += f"/roi-{ROI_SCAN_DPI}"
+    # Token filtering and row clustering decide which OCR rows come out
+    if (OCR_MIN_CONFIDENCE, ROW_GAP_FACTOR) != (0.5, 0.6):
+        version += f"/rows-{OCR_MIN_CONFIDENCE:g}-{ROW_GAP_FACTOR:g}"
+    return version
@@ -0,0 +1,219 @@
+import os
+import threading
+import time
+
+from src.runner import safe_process_file
+
+# A dropped file counts as complete once its size and mtime stop changing for this long
+WATCH_SETTLE_SECONDS = float(os.getenv("WATCH_SETTLE_SECONDS", "2"))
+# Rescan interval without inotify; with inotify a slow rescan still catches missed events
+WATCH_POLL_SECONDS = float(os.getenv("WATCH_POLL_SECONDS", "5"))
+WATCH_RESCAN_SECONDS = float(os.getenv("WATCH_RESCAN_SECONDS", "300"))
+
+PROCESSED_DIR = "processed"
+FAILED_DIR = "failed"
+
+
+def _is_candidate(name):
+    # Partial uploads are usually written under a temporary name and renamed when done
+    return name.lower().endswith(".pdf") and not name.startswith(".")
+
+
+class DropFolderWatcher:
+    """
+    Streams the PDFs dropped into a folder, each once it has finished writing.
+    Uses inotify through watchdog when it is installed and falls back to polling.
+    Files already in the folder on start are picked up too, so a restart resumes
+    with whatever was not archived yet.
+    """
+
+    def __init__(self, folder, settle_seconds=WATCH_SETTLE_SECONDS, poll_seconds=WATCH_POLL_SECONDS,
+                 use_inotify=True):
+        self.folder = folder
+        self.settle_seconds = settle_seconds
+        self.poll_seconds = poll_seconds
+        self.use_inotify = use_inotify
+        self.mode = None
+        self._pending = {}  # name -> (size, mtime_ns) or None, and when it last changed
+        self._taken = set()  # handed out and not yet archived
+        self._empty = {}  # settled zero-byte files -> (size, mtime_ns), parked until they change
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._observer = None
+
+    # ---------------- DISCOVERY ---------------- #
+
+    def notice(self, name):
+        """Marks a file as possibly new or changed (called from inotify events and rescans)."""
+        if not _is_candidate(name):
+            return
+        with self._lock:
+            if name in self._empty:
+                try:
+                    st = os.stat(os.path.join(self.folder, name))
+                except FileNotFoundError:
+                    del self._empty[name]
+                    return
+                if (st.st_size, st.st_mtime_ns) == self._empty[name]:
+                    return
+                del self._empty[name]
+            if name not in self._taken and name not in self._pending:
+                self._pending[name] = (None, time.monotonic())
+        self._wake.set()
+
+    def rescan(self):
+        seen = set()
+        with os.scandir(self.folder) as entries:
+            for entry in entries:
+                if entry.is_file():
+                    seen.add(entry.name)
+                    self.notice(entry.name)
+        with self._lock:
+            for name in set(self._empty) - seen:
+                del self._empty[name]
+
+    def _start_inotify(self):
+        try:
+            from watchdog.events import FileSystemEventHandler
+            from watchdog.observers import Observer
+        except ImportError:
+            print("--- watchdog not installed; polling the drop folder ---")
+            return False
+
+        watcher = self
+
+        class _Handler(FileSystemEventHandler):
+            def on_created(self, event):
+                if not event.is_directory:
+                    watcher.notice(os.path.basename(event.src_path))
+
+            def on_modified(self, event):
+                self.on_created(event)
+
+            def on_moved(self, event):
+                if not event.is_directory and os.path.dirname(event.dest_path) == os.path.abspath(watcher.folder):
+                    watcher.notice(os.path.basename(event.dest_path))
+
+            def on_closed(self, event):
+                self.on_created(event)
+
+        self._observer = Observer()
+        self._observer.schedule(_Handler(), os.path.abspath(self.folder), recursive=False)
+        self._observer.start()
+        return True
+
+    def start(self):
+        os.makedirs(self.folder, exist_ok=True)
+        self.mode = "inotify" if self.use_inotify and self._start_inotify() else "polling"
+        self.rescan()
+        print(f"--- Watching {self.folder} ({self.mode}) ---")
+
+    def stop(self):
+        if self._observer is not None:
+            self._observer.stop()
+            self._observer.join()
+            self._observer = None
+
+    # ---------------- SETTLING ---------------- #
+
+    def _settled(self):
+        """Names whose size and mtime have not changed for settle_seconds."""
+        now = time.monotonic()
+        ready = []
+        with self._lock:
+            for name, (signature, since) in list(self._pending.items()):
+                try:
+                    st = os.stat(os.path.join(self.folder, name))
+                except FileNotFoundError:
+                    del self._pending[name]
+                    continue
+                current = (st.st_size, st.st_mtime_ns)
+                if current != signature:
+                    self._pending[name] = (current, now)
+                elif now - since >= self.settle_seconds:
+                    del self._pending[name]
+                    if st.st_size == 0:
+                        # Possibly a placeholder written later; wait for it to change instead of polling
+                        self._empty[name] = current
+                    else:
+                        self._taken.add(name)
+                        ready.append(name)
+        return sorted(ready)
+
+    def ready_files(self, stop_event=None, on_tick=None, tick_seconds=None):
+        """
+        Yields file names as they become complete, until stop_event is set.
+        on_tick is called at least every tick_seconds, also while no files arrive.
+        """
+        stop_event = stop_event or threading.Event()
+        rescan_every = self.poll_seconds if self.mode == "polling" else WATCH_RESCAN_SECONDS
+        last_rescan = time.monotonic()
+        while not stop_event.is_set():
+            if on_tick is not None:
+                on_tick()
+            if time.monotonic() - last_rescan >= rescan_every:
+                self.rescan()
+                last_rescan = time.monotonic()
+            ready = self._settled()
+            for i, name in enumerate(ready):
+                if stop_event.is_set():
+                    for left in ready[i:]:
+                        self.done(left)  # left in the folder for the next start
+                    break
+                yield name
+            with self._lock:
+                waiting = bool(self._pending)
+            # Re-check pending files often; otherwise sleep until an event, the next rescan or tick
+            timeout = min(0.5, self.settle_seconds) if waiting else rescan_every
+            if tick_seconds:
+                timeout = min(timeout, tick_seconds)
+            self._wake.wait(timeout=timeout)
+            self._wake.clear()
+
+    def done(self, name):
+        with self._lock:
+            self._taken.discard(name)
+
+
+def archive(folder, file_name, failed=False):
+    """Moves a handled file out of the drop folder so restarts and rescans skip it."""
+    target_dir = os.path.join(folder, FAILED_DIR if failed else PROCESSED_DIR)
+    os.makedirs(target_dir, exist_ok=True)
+    target = os.path.join(target_dir, file_name)
+    if os.path.exists(target):
+        stem, ext = os.path.splitext(file_name)
+        target = os.path.join(target_dir, f"{stem}.{time.strftime('%Y%m%d-%H%M%S')}{ext}")
+    os.replace(os.path.join(folder, file_name), target)
+    return target
+
+
+def watch_folder(folder="raw_files", on_result=None, cache=None, stop_event=None, use_inotify=True,
+                 checkpoints=None, on_tick=None, tick_seconds=None):
+    """
+    Daemon loop: every PDF that finishes arriving in `folder` runs through the graph once,
+    its result goes to on_result, and the file moves to processed/ (or failed/).
+    With checkpoints, a file the daemon was killed on resumes after its last finished node.
+    on_tick runs periodically from the loop (e.g. to flush buffered output while idle).
+    """
+    watcher = DropFolderWatcher(folder, use_inotify=use_inotify)
+    watcher.start()
+    try:
+        for file_name in watcher.ready_files(stop_event, on_tick=on_tick, tick_seconds=tick_seconds):
+            print(f"\n>>> New file: {file_name}")
+            result = safe_process_file(file_name, raw_folder=folder, cache=cache, checkpoints=checkpoints)
+            # One file's output or archive failure (disk full, file removed) must not stop the daemon
+            failed = "error" in result
+            try:
+                if on_result is not None:
+                    on_result(result)
+            except Exception as e:
+                print(f">>> Could not save the result for {file_name}: {type(e).__name__}: {e}")
+                failed = True  # to failed/ rather than retried on every rescan
+            try:
+                archive(folder, file_name, failed=failed)
+            except Exception as e:
+                print(f">>> Could not archive {file_name}: {type(e).__name__}: {e}")
+            finally:
+                watcher.done(file_name)
+    finally:
+        watcher.stop()